@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""compare CsvFormatter with the former row by row implementation
+
+prints rows/sec of each table of test/sample.py.
+tables with Faker columns (m_area, m_product) are bound by Faker itself.
+
+python benchmark/csv_formatter.py [rows]
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import csv
+import os
+import sys
+import time
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__),
+                 '..')
+)
+from test import sample
+from testdatautil.datagenerator import CsvFormatter, formatdict
+from testdatautil.dataset import from_sqlalchemy_tables
+from testdatautil.rule import SqlAlchemyRuleSet
+
+
+def write_rowwise(dataschema, file_handle, length):
+    writer = csv.writer(file_handle)
+    keys = dataschema.keys()
+    writer.writerow([key for key in keys])
+    for data in dataschema.generate(length):
+        formatted = formatdict(data)
+        writer.writerow([formatted[key] for key in keys])
+
+
+def write_compiled(dataschema, file_handle, length):
+    CsvFormatter(None, length).write_file(dataschema, file_handle)
+
+
+def measure(func, dataschema, length):
+    started = time.time()
+    with open(os.devnull, 'w', newline='') as fio:
+        func(dataschema, fio, length)
+    return length / (time.time() - started)
+
+
+def main():
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    metadata = from_sqlalchemy_tables(sample.BaseMaster.metadata.sorted_tables,
+                                      SqlAlchemyRuleSet.create())
+    print('{:<12} {:>14} {:>14} {:>8}'.format('table', 'row by row', 'compiled', 'speedup'))
+    for name, dataschema in sorted(metadata.items()):
+        rowwise = measure(write_rowwise, dataschema, length)
+        compiled = measure(write_compiled, dataschema, length)
+        print('{:<12} {:>14,.0f} {:>14,.0f} {:>7.1f}x'.format(name, rowwise, compiled,
+                                                             compiled / rowwise))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""compare linear rule lookup with the compiled RuleIndex
+
+builds a synthetic schema (100,000 columns by default) of mixed types
+and name suffixes, and prints the time to find the rule of every column
+and the time of ``RuleSet.apply_all``.
+
+python benchmark/rule_dispatch.py [columns]
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import os
+import sys
+import time
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__),
+                 '..')
+)
+from sqlalchemy import (Boolean, Column, Date, DateTime, Float, Integer,
+                        MetaData, String, Table)
+from testdatautil.dataset import from_sqlalchemy_tables
+from testdatautil.rule import SqlAlchemyRuleSet
+
+COLUMNS_PER_TABLE = 100
+KINDS = [
+    ('amount_{}', Integer),
+    ('ratio_{}', Float),
+    ('label_{}', lambda: String(20)),
+    ('created_{}', DateTime),
+    ('day_{}', Date),
+    ('flag_{}', Boolean),
+    ('c{}_name', lambda: String(20)),
+    ('c{}_email', lambda: String(40)),
+]
+
+
+def create_tables(columns, columns_per_table=COLUMNS_PER_TABLE):
+    metadata = MetaData()
+    tables = []
+    for table_no in range(max(1, columns // columns_per_table)):
+        fields = [Column('id', Integer, primary_key=True)]
+        for no in range(columns_per_table - 1):
+            name, type_ = KINDS[no % len(KINDS)]
+            fields.append(Column(name.format(no), type_()))
+        tables.append(Table('t{}'.format(table_no), metadata, *fields))
+    return tables
+
+
+def measure(func):
+    started = time.time()
+    func()
+    return time.time() - started
+
+
+def main():
+    columns = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tables = create_tables(columns)
+    fields = [field for table in tables for field in table.columns]
+    rule_set = SqlAlchemyRuleSet.create()
+    rules = rule_set.rules
+
+    def linear():
+        for field in fields:
+            rule_set.find_rule(rules, field)
+
+    def indexed():
+        index = rule_set.compile()
+        for field in fields:
+            index.find_rule(field)
+
+    print('columns: {:,}'.format(len(fields)))
+    linear_time = measure(linear)
+    indexed_time = measure(indexed)
+    print('find rule   linear {:8.3f}s  index {:8.3f}s  {:5.1f}x'.format(
+        linear_time, indexed_time, linear_time / indexed_time))
+    print('apply_all          {:8.3f}s'.format(
+        measure(lambda: from_sqlalchemy_tables(tables, rule_set))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""benchmark suite
+
+measures
+- rows/sec of the factory of each rule of SqlAlchemyRuleSet
+- rows/sec of CsvFormatter, JsonFormatter, PythonFormatter and FixtureFormatter
+- RuleSet.apply_all time as the number of tables and columns grows
+- rows/sec and peak memory of DataGenerator.generate on test/sample.py
+
+results are written as JSON. with --compare, results are compared with
+a previous result file, and the exit status is 1 if any result is worse
+than the baseline by more than --threshold.
+
+python benchmark/suite.py [-o results.json] [--rows N] [--scale N] [--repeat N]
+python benchmark/suite.py --compare baseline.json [--threshold 0.2]
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__),
+                 '..')
+)
+from sqlalchemy import (Boolean, Column, Date, DateTime, Float, ForeignKey,
+                        Integer, MetaData, String, Table)
+from test import sample
+from testdatautil.datagenerator import (CsvFormatter, DataGenerator, FixtureFormatter,
+                                        JsonFormatter, PythonFormatter)
+from testdatautil.dataset import from_sqlalchemy_tables
+from testdatautil.rule import SqlAlchemyRuleSet
+from rule_dispatch import create_tables
+
+HIGHER = 'higher'
+LOWER = 'lower'
+
+
+def rule_tables():
+    """one table per built-in rule, whose column is matched by the rule"""
+    metadata = MetaData()
+    columns = [
+        ('SAInteger', Column('value', Integer)),
+        ('SAFloat', Column('value', Float)),
+        ('SAString', Column('value', String(20))),
+        ('SADateTime', Column('value', DateTime)),
+        ('SADate', Column('value', Date)),
+        ('SABoolean', Column('value', Boolean)),
+        ('SAName', Column('first_name', String(20))),
+        ('SAEmail', Column('email', String(40))),
+        ('SAIntUnique', Column('value', Integer, unique=True)),
+        ('SAStrUnique', Column('value', String(20), unique=True)),
+        ('SAForeignKey', Column('value', Integer, ForeignKey('SAAutoIncrement.id'))),
+    ]
+    tables = [Table('SAAutoIncrement', metadata,
+                    Column('id', Integer, primary_key=True))]
+    for name, column in columns:
+        tables.append(Table(name, metadata, column))
+    return tables
+
+
+def measure(func):
+    started = time.time()
+    func()
+    return time.time() - started
+
+
+def time_per_call(func, min_time=0.2):
+    """shortest time of ``func``, called until ``min_time`` passed"""
+    times = []
+    while sum(times) < min_time:
+        times.append(measure(func))
+    return min(times)
+
+
+def throughput(func, rows):
+    """rows/sec of ``func`` generating ``rows`` rows"""
+    return rows / time_per_call(func)
+
+
+def result(value, unit, better):
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def bench_rules(rows):
+    results = dict()
+    metadata = from_sqlalchemy_tables(rule_tables(), SqlAlchemyRuleSet.create())
+    # keys of the parent, drawn by SAForeignKey
+    metadata.tables['SAAutoIncrement']['id'].get_key_pool().set_length(rows)
+    formatter = CsvFormatter(None, rows)
+    for name, table in metadata.items():
+        def generate():
+            for batch in formatter.batches(table):
+                pass
+        results['rule.{}'.format(name)] = result(throughput(generate, rows),
+                                                 'rows/s', HIGHER)
+    return results
+
+
+def bench_formatters(rows):
+    results = dict()
+    metadata = from_sqlalchemy_tables(sample.BaseMaster.metadata.sorted_tables,
+                                      SqlAlchemyRuleSet.create(pool_size=10000))
+    formatters = [('csv', CsvFormatter(None, rows)),
+                  ('json', JsonFormatter(None, rows)),
+                  ('python', PythonFormatter(None, rows)),
+                  ('fixture', FixtureFormatter(None, rows))]
+    for name, formatter in formatters:
+        stream = io.BytesIO if name == 'fixture' else io.StringIO
+
+        def write():
+            for table_name, table in metadata.items():
+                formatter.write_file(table, stream())
+        results['formatter.{}'.format(name)] = result(
+            throughput(write, rows * len(metadata.tables)), 'rows/s', HIGHER)
+    return results
+
+
+def bench_apply_all():
+    results = dict()
+    for columns in (1000, 10000):
+        for columns_per_table in (10, 100):
+            tables = create_tables(columns, columns_per_table)
+            rule_set = SqlAlchemyRuleSet.create()
+            elapsed = time_per_call(lambda: from_sqlalchemy_tables(tables, rule_set))
+            name = 'apply_all.{}tables_x{}columns'.format(len(tables),
+                                                          columns_per_table)
+            results[name] = result(elapsed, 's', LOWER)
+    return results
+
+
+def bench_generate(rows):
+    metadata = from_sqlalchemy_tables(sample.BaseMaster.metadata.sorted_tables,
+                                      SqlAlchemyRuleSet.create(pool_size=10000))
+    dirname = tempfile.mkdtemp()
+    try:
+        generator = DataGenerator(metadata=metadata, directory=dirname,
+                                  table_names=None, length=rows, seed=1)
+        tracemalloc.start()
+        try:
+            elapsed = measure(generator.generate)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        shutil.rmtree(dirname)
+    return {
+        'generate.rows_per_sec': result(rows * len(metadata.tables) / elapsed,
+                                        'rows/s', HIGHER),
+        'generate.peak_memory': result(peak / 2 ** 20, 'MiB', LOWER),
+    }
+
+
+def run(rows, scale):
+    results = dict()
+    results.update(bench_rules(rows))
+    results.update(bench_formatters(rows))
+    results.update(bench_apply_all())
+    results.update(bench_generate(rows * scale))
+    return results
+
+
+def best_of(runs):
+    """best value of each result over ``runs``, to reduce noise"""
+    results = dict()
+    for run_results in runs:
+        for name, current in run_results.items():
+            best = results.get(name)
+            if (best is None or
+                    (current['better'] == HIGHER) == (current['value'] > best['value'])):
+                results[name] = current
+    return results
+
+
+def compare(results, baseline, threshold):
+    """names of results worse than ``baseline`` by more than ``threshold``"""
+    regressions = []
+    for name, current in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current['better'] == HIGHER:
+            regressed = current['value'] < base['value'] * (1 - threshold)
+        else:
+            regressed = current['value'] > base['value'] * (1 + threshold)
+        print('{:<40} {:>14,.3f} {:>14,.3f} {:<8} {}'.format(
+            name, base['value'], current['value'], current['unit'],
+            'REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', help='write results to this JSON file')
+    parser.add_argument('--rows', type=int, default=20000,
+                        help='rows per factory and formatter benchmark')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='multiply rows of the end-to-end run')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='run the suite this number of times and keep the best results')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='compare with results of a previous run')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative change treated as a regression')
+    args = parser.parse_args(argv)
+
+    results = best_of([run(args.rows, args.scale) for _ in range(args.repeat)])
+    document = {
+        'environment': {'python': platform.python_version(),
+                        'platform': platform.platform()},
+        'parameters': {'rows': args.rows, 'scale': args.scale,
+                       'repeat': args.repeat},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fio:
+            json.dump(document, fio, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as fio:
+            baseline = json.load(fio)['results']
+        if compare(results, baseline, args.threshold):
+            return 1
+    else:
+        for name, item in sorted(results.items()):
+            print('{:<40} {:>14,.3f} {}'.format(name, item['value'], item['unit']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
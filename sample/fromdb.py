@@ -8,7 +8,7 @@ sys.path.append(
                  '..')
 )
 from testdatautil import cli, dataset
-from testdatautil.rule import SqlAlchemyRuleSet
+from testdatautil.plan import plan_key, schema_fingerprint
 from sqlalchemy import create_engine
 from sqlalchemy import MetaData
 
@@ -30,12 +30,19 @@ def main():
     parser.add_argument('-u', '--user')
     parser.add_argument('-p', '--password')
     args = parser.parse_args()
-    rule = SqlAlchemyRuleSet.create()
     engine = connect(args)
-    meta = MetaData()
-    meta.reflect(bind=engine)
-    testdatameta = dataset.from_sqlalchemy_tables(meta.sorted_tables,
-                                                  rule_set=rule)
+    rule = command.rule_set(args, engine)
+
+    def build():
+        meta = MetaData()
+        meta.reflect(bind=engine)
+        return dataset.from_sqlalchemy_tables(meta.sorted_tables,
+                                              rule_set=rule)
+
+    key = None
+    if args.plan:
+        key = plan_key(schema_fingerprint(engine), rule)
+    testdatameta = command.load_metadata(args, key, build)
     command.execute(args, testdatameta)
 
 
@@ -15,7 +15,13 @@ setup(
     install_requires=[
         'fake-factory >= 0.5'
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
     packages=find_packages(),
+    entry_points={
+        'pytest11': ['testdatautil = testdatautil.pytest_plugin'],
+    },
     include_package_data=True,
     classifiers=[
         "Intended Audience :: Developers",
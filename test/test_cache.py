@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import faker
+from testdatautil import cache
+from testdatautil.cache import DatasetSpec, cached_directory, load_dataset
+from testdatautil.rule import SAEmail, SqlAlchemyRuleSet
+from . import sample
+
+
+def test_dataset_key():
+    tables = sample.BaseMaster.metadata.sorted_tables
+    spec = DatasetSpec(tables, seed=1, length=20)
+    assert spec.key() == DatasetSpec(tables, seed=1, length=20).key()
+    assert spec.key() != DatasetSpec(tables, seed=2, length=20).key()
+    assert spec.key() != DatasetSpec(tables, seed=1, length=21).key()
+    assert spec.key() != DatasetSpec(tables[:2], seed=1, length=20).key()
+    assert spec.key() != DatasetSpec(tables, seed=1, length=20,
+                                     table_lengths={'m_area': 5}).key()
+    rule_set = SqlAlchemyRuleSet.create()
+    rule_set.add_rule(SAEmail())
+    assert spec.key() != DatasetSpec(tables, rule_set, seed=1, length=20).key()
+
+
+def test_dataset_key_versions(monkeypatch):
+    spec = DatasetSpec(sample.BaseMaster.metadata.sorted_tables, seed=1, length=20)
+    key = spec.key()
+    monkeypatch.setattr(cache, '__version__', '0.0.0')
+    assert spec.key() != key
+    monkeypatch.undo()
+    monkeypatch.setattr(faker, 'VERSION', '0.0.0')
+    assert spec.key() != key
+
+
+def test_cached_directory_built_once():
+    dirname = tempfile.mkdtemp()
+    built = []
+
+    def build(directory):
+        built.append(directory)
+        time.sleep(0.2)
+        with open(os.path.join(directory, 'data'), 'w') as fio:
+            fio.write('data')
+
+    try:
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(cached_directory(dirname, 'key', build)))
+            for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(built) == 1
+        assert results == [os.path.join(dirname, 'key')] * 3
+        assert os.listdir(results[0]) == ['data']
+        cached_directory(dirname, 'key', build, rebuild=True)
+        assert len(built) == 2
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_load_dataset():
+    dirname = tempfile.mkdtemp()
+    try:
+        spec = DatasetSpec(sample.BaseMaster.metadata.sorted_tables, seed=1, length=15,
+                           table_lengths={'m_stage': 'm_area*2'})
+        dataset = load_dataset(spec, dirname)
+        assert sorted(dataset.keys()) == ['m_area', 'm_product', 'm_stage', 'm_term']
+        assert len(dataset['m_stage']) == 30
+        assert dataset['m_area'] is dataset['m_area']
+        assert [row['id'] for row in dataset['m_area']] == list(range(1, 16))
+        assert load_dataset(spec, dirname)['m_stage'] == dataset['m_stage']
+        assert len(os.listdir(dirname)) == 2  # dataset and lock file
+    finally:
+        shutil.rmtree(dirname)
+
+
+CONFTEST = '''
+import pytest
+from test import sample
+from testdatautil.cache import DatasetSpec
+
+
+@pytest.fixture(scope='session')
+def testdata_spec():
+    return DatasetSpec(sample.BaseMaster.metadata.sorted_tables, seed=1, length=12)
+'''
+
+TEST_MODULE = '''
+def test_dataset(testdata):
+    assert len(testdata['m_area']) == 12
+
+
+def test_same_dataset(testdata):
+    assert testdata['m_term'] is testdata['m_term']
+'''
+
+
+def test_plugin_imports_lazily():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    code = ('import sys, testdatautil.pytest_plugin; '
+            'assert not {"faker", "testdatautil.cache"} & set(sys.modules)')
+    assert subprocess.call([sys.executable, '-c', code], cwd=root) == 0
+
+
+def test_pytest_plugin():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    dirname = tempfile.mkdtemp()
+    try:
+        for filename, text in [('conftest.py', CONFTEST), ('test_data.py', TEST_MODULE)]:
+            with open(os.path.join(dirname, filename), 'w') as fio:
+                fio.write(textwrap.dedent(text))
+        cache_dir = os.path.join(dirname, 'cache')
+        env = dict(os.environ, PYTHONPATH=root)
+        command = [sys.executable, '-m', 'pytest', '-q', '-p', 'testdatautil.pytest_plugin',
+                   '-p', 'no:cacheprovider', '--testdata-cache', cache_dir, dirname]
+        for _ in range(2):
+            proc = subprocess.run(command, cwd=dirname, env=env, stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT, universal_newlines=True)
+            assert proc.returncode == 0, proc.stdout
+            assert '2 passed' in proc.stdout
+        assert len([name for name in os.listdir(cache_dir)
+                    if not name.endswith('.lock')]) == 1
+    finally:
+        shutil.rmtree(dirname)
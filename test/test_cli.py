@@ -3,6 +3,8 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 import os
 import shutil
+import subprocess
+import sys
 import tempfile
 from test import sample
 from testdatautil.cli import execute_from_command_line
@@ -26,4 +28,70 @@ def test_cli():
     execute_from_command_line(metadata=testdatameta, argv=argv)
     filename = os.path.join(dirname, "m_area.csv")
     assert os.path.exists(filename)
-    shutil.rmtree(dirname)
\ No newline at end of file
+    shutil.rmtree(dirname)
+
+
+def test_cli_reflects_database():
+    from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine
+    dirname = tempfile.mkdtemp()
+    try:
+        url = 'sqlite:///' + os.path.join(dirname, 'test.db')
+        meta = MetaData()
+        Table('item', meta,
+              Column('id', Integer, primary_key=True),
+              Column('name', String(20)))
+        meta.create_all(create_engine(url))
+        output = os.path.join(dirname, 'out')
+        plan = os.path.join(dirname, 'plan.gz')
+        argv = ['-o{}'.format(output), '-r5', '--db-url', url, '--plan', plan]
+        execute_from_command_line(argv=argv)
+        assert os.path.exists(plan)
+        with open(os.path.join(output, 'item.csv')) as fio:
+            assert len(fio.read().splitlines()) == 6
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_help_import_time():
+    """``python -m testdatautil --help`` does not import heavy dependencies"""
+    root = os.path.join(os.path.dirname(__file__), '..')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-m',
+                           'testdatautil', '--help'],
+                          cwd=root, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    assert proc.returncode == 0
+    assert 'usage: python -m testdatautil' in proc.stdout
+    modules = dict()
+    for line in proc.stderr.splitlines()[1:]:
+        if line.startswith('import time:'):
+            self_time, cumulative, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = int(self_time)
+    for heavy in ('faker', 'numpy', 'sqlalchemy', 'testdata'):
+        assert heavy not in modules
+    assert sum(modules.values()) < 100000
+
+
+def test_rule_imports_sqlalchemy_lazily():
+    root = os.path.join(os.path.dirname(__file__), '..')
+    code = 'import sys, testdatautil.rule; assert "sqlalchemy" not in sys.modules'
+    assert subprocess.call([sys.executable, '-c', code], cwd=root) == 0
+
+
+def test_cli_table_rows():
+    dirname = tempfile.mkdtemp()
+    try:
+        config = os.path.join(dirname, 'rows.json')
+        with open(config, 'w') as fio:
+            fio.write('{"m_area": 4, "m_stage": "m_area*3"}')
+        testdatameta = from_sqlalchemy_tables(sample.BaseMaster.metadata.sorted_tables,
+                                              rule_set=MyRule.create())
+        argv = ['-o{}'.format(dirname), '-r2', '--rows-config', config,
+                '--rows', 'm_area=5']
+        execute_from_command_line(metadata=testdatameta, argv=argv)
+        counts = dict()
+        for name in ('m_area', 'm_stage', 'm_term'):
+            with open(os.path.join(dirname, name + '.csv')) as fio:
+                counts[name] = len(fio.read().splitlines()) - 1
+        assert counts == {'m_area': 5, 'm_stage': 15, 'm_term': 2}
+    finally:
+        shutil.rmtree(dirname)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from collections import OrderedDict
+from datetime import date, datetime
+import csv
+import io
+import os
+import shutil
+import tempfile
+import numpy
+from testdatautil.columnar import read_columnar, write_columnar
+from testdatautil.datagenerator import DataGenerator
+from testdatautil.schema import Column
+from testdatautil.serializer import format_value
+from .test_datagenerator import create_metadata, generate
+
+
+def test_columnar_format():
+    metadata = create_metadata()
+    expected = generate(metadata, length=30, seed=4)
+    dirname = tempfile.mkdtemp()
+    try:
+        DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                      format='columnar', length=30, seed=4).generate()
+        for table_name in metadata.tables:
+            table = read_columnar(os.path.join(dirname, table_name))
+            assert len(table) == 30
+            rows = list(csv.DictReader(io.StringIO(expected[table_name + '.csv'])))
+            for key in table.keys():
+                values = [format_value(val) for val in table.column(key)]
+                assert values == [row[key] for row in rows]
+            assert isinstance(table['id'], numpy.memmap)
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_columnar_nulls():
+    columns = [Column('num', None, python_type=int), Column('text', None),
+               Column('day', None), Column('when', None)]
+    batches = [
+        OrderedDict([('num', [1, None, 3]), ('text', ['a', None, 'ü']),
+                     ('day', [date(2020, 1, 1), None, None]),
+                     ('when', [datetime(2020, 1, 1, 1), None, None])]),
+        OrderedDict([('num', [4, 5, None, 7, 8]), ('text', ['', 'xyz', None, 'q', 'r']),
+                     ('day', [None, None, date(2021, 2, 3), None, None]),
+                     ('when', [None] * 5)]),
+    ]
+    dirname = tempfile.mkdtemp()
+    try:
+        write_columnar(dirname, 'nulls', columns, batches, 8)
+        table = read_columnar(dirname)
+        assert table.column('num') == [1, None, 3, 4, 5, None, 7, 8]
+        assert table['num'].dtype == numpy.int64
+        assert table.column('text') == ['a', None, 'ü', '', 'xyz', None, 'q', 'r']
+        assert table['text'][2] == 'ü'
+        assert table.column('day') == [date(2020, 1, 1), None, None, None, None,
+                                       date(2021, 2, 3), None, None]
+        assert table.column('when')[0] == datetime(2020, 1, 1, 1)
+        assert table.valid('when').tolist() == [True] + [False] * 7
+    finally:
+        shutil.rmtree(dirname)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import pytest
+from testdatautil.compress import BackgroundWriter, ParallelGzipWriter, open_output
+from .test_datagenerator import create_metadata, generate
+
+
+def test_parallel_gzip():
+    dirname = tempfile.mkdtemp()
+    try:
+        path = os.path.join(dirname, 'data.gz')
+        data = b''.join(b'line %d\n' % i for i in range(50000))
+        with ParallelGzipWriter(path, block_size=4096, workers=3) as fio:
+            for i in range(0, len(data), 1000):
+                fio.write(data[i:i + 1000])
+        with gzip.open(path, 'rb') as fio:
+            assert fio.read() == data
+        if shutil.which('gzip'):
+            assert subprocess.check_output(['gzip', '-dc', path]) == data
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_open_output():
+    dirname = tempfile.mkdtemp()
+    try:
+        for ext, module in (('.gz', gzip), ('.bz2', bz2), ('.xz', lzma)):
+            path = os.path.join(dirname, 'data.csv' + ext)
+            with open_output(path) as fio:
+                fio.write('あ,1\n')
+            with module.open(path, 'rt', encoding='utf-8') as fio:
+                assert fio.read() == 'あ,1\n'
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_compressed_generation():
+    metadata = create_metadata()
+    plain = generate(metadata, length=40, seed=1, shard_size=15, raw=True)
+    for compress, ext, module in (('gzip', '.gz', gzip), ('xz', '.xz', lzma)):
+        compressed = generate(metadata, length=40, seed=1, shard_size=15,
+                              workers=2, compress=compress, raw=True)
+        assert sorted(compressed.keys()) == sorted(name + ext for name in plain.keys())
+        for name, data in plain.items():
+            assert module.decompress(compressed[name + ext]) == data
+
+
+class SlowFile(object):
+    def __init__(self, fail_at=None):
+        self.chunks = []
+        self.closed = False
+        self._fail_at = fail_at
+
+    def write(self, data):
+        if len(self.chunks) == self._fail_at:
+            raise IOError('disk full')
+        time.sleep(0.001)
+        self.chunks.append(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_background_writer():
+    fileobj = SlowFile()
+    with BackgroundWriter(fileobj, max_pending=10) as fio:
+        for i in range(100):
+            fio.write('line {}\n'.format(i))
+            assert fio._pending <= 10
+    assert fileobj.closed
+    assert ''.join(fileobj.chunks) == ''.join('line {}\n'.format(i) for i in range(100))
+
+    fio = BackgroundWriter(SlowFile(fail_at=3), max_pending=10)
+    with pytest.raises(IOError):
+        for i in range(100):
+            fio.write('line {}\n'.format(i))
+    # the error stays, later writes do not wait for the stopped thread
+    for _ in range(20):
+        with pytest.raises(IOError):
+            fio.write('line\n')
+    with pytest.raises(IOError):
+        fio.close()
+
+    fio = BackgroundWriter(SlowFile(), max_pending=10)
+    fio.close()
+    with pytest.raises(ValueError):
+        fio.write('line\n')
+
+
+def test_io_queue_output():
+    metadata = create_metadata()
+    expected = generate(metadata, length=40, seed=3)
+    assert generate(metadata, length=40, seed=3, io_queue_size=100) == expected
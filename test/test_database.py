@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import os
+import shutil
+import tempfile
+import pytest
+from sqlalchemy import (Column, DateTime, Integer, MetaData, String, Table,
+                        create_engine, func, inspect, select, text)
+from testdatautil.datagenerator import DataGenerator, DatabaseFormatter
+from testdatautil.dataset import from_sqlalchemy_tables
+from testdatautil.rule import SqlAlchemyRuleSet
+
+meta = MetaData()
+item = Table('item', meta,
+             Column('id', Integer, primary_key=True),
+             Column('code', String(20), index=True),
+             Column('price', Integer),
+             Column('created', DateTime))
+
+
+def count(engine, table):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_database_formatter():
+    dirname = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(dirname, 'test.db'))
+        meta.create_all(engine)
+        formatter = DatabaseFormatter(engine, 25, tables=[item], batch_size=10,
+                                      drop_indexes=True, fast_load=True)
+        testdatameta = from_sqlalchemy_tables([item], SqlAlchemyRuleSet.create())
+        DataGenerator(metadata=testdatameta, directory=None,
+                      table_names=None, formatter=formatter).generate()
+
+        assert count(engine, item) == 25
+        with engine.connect() as connection:
+            ids = connection.execute(select(item.c.id)).scalars().all()
+        assert sorted(ids) == list(range(1, 26))
+        assert [ix['name'] for ix in inspect(engine).get_indexes('item')] == ['ix_item_code']
+    finally:
+        shutil.rmtree(dirname)
+
+
+class FailingDatabaseFormatter(DatabaseFormatter):
+    def write_file(self, dataschema, file_handle, start=0, stop=None, table=None):
+        raise RuntimeError('killed')
+
+
+def test_indexes_recreated_after_failure():
+    dirname = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(dirname, 'test.db'))
+        meta.create_all(engine)
+        formatter = FailingDatabaseFormatter(engine, 5, tables=[item], drop_indexes=True)
+        testdatameta = from_sqlalchemy_tables([item], SqlAlchemyRuleSet.create())
+        with pytest.raises(RuntimeError):
+            DataGenerator(metadata=testdatameta, directory=None,
+                          table_names=None, formatter=formatter).generate()
+        assert [ix['name'] for ix in inspect(engine).get_indexes('item')] == ['ix_item_code']
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_fast_load_settings_restored():
+    dirname = tempfile.mkdtemp()
+    try:
+        # one pooled connection, used by the formatter and then by the test
+        engine = create_engine('sqlite:///' + os.path.join(dirname, 'test.db'),
+                               pool_size=1, max_overflow=0)
+        meta.create_all(engine)
+        with engine.connect() as connection:
+            before = [connection.execute(text('PRAGMA synchronous')).scalar(),
+                      connection.execute(text('PRAGMA journal_mode')).scalar()]
+        formatter = DatabaseFormatter(engine, 5, tables=[item], fast_load=True)
+        testdatameta = from_sqlalchemy_tables([item], SqlAlchemyRuleSet.create())
+        DataGenerator(metadata=testdatameta, directory=None,
+                      table_names=None, formatter=formatter).generate()
+        with engine.connect() as connection:
+            after = [connection.execute(text('PRAGMA synchronous')).scalar(),
+                     connection.execute(text('PRAGMA journal_mode')).scalar()]
+        assert after == before
+        assert count(engine, item) == 5
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_database_format_reflects_tables():
+    dirname = tempfile.mkdtemp()
+    try:
+        url = 'sqlite:///' + os.path.join(dirname, 'test.db')
+        engine = create_engine(url)
+        meta.create_all(engine)
+        testdatameta = from_sqlalchemy_tables([item], SqlAlchemyRuleSet.create())
+        DataGenerator(metadata=testdatameta, directory=None, table_names=None,
+                      format='database', db_url=url, length=7).generate()
+        assert count(engine, item) == 7
+    finally:
+        shutil.rmtree(dirname)
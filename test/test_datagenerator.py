@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import os
+import shutil
+import tempfile
+import tracemalloc
+import pytest
+from sqlalchemy import (Column as SAColumn, ForeignKey, Integer, MetaData as SAMetaData,
+                        String, Table as SATable)
+from . import sample
+from testdatautil.checkpoint import FILENAME as CHECKPOINT_FILENAME
+from testdatautil.datagenerator import CsvFormatter, DataGenerator, PythonFormatter
+from testdatautil.dataset import from_sqlalchemy_tables
+from testdatautil.rule import SqlAlchemyRuleSet
+
+
+def read_outputs(dirname, raw=False):
+    result = dict()
+    for filename in sorted(os.listdir(dirname)):
+        with open(os.path.join(dirname, filename), 'rb' if raw else 'r') as fio:
+            result[filename] = fio.read()
+    return result
+
+
+def generate(metadata, raw=False, **kwargs):
+    dirname = tempfile.mkdtemp()
+    try:
+        generator = DataGenerator(metadata=metadata, directory=dirname,
+                                  table_names=None, **kwargs)
+        generator.generate()
+        return read_outputs(dirname, raw=raw)
+    finally:
+        shutil.rmtree(dirname)
+
+
+def create_metadata():
+    return from_sqlalchemy_tables(sample.BaseMaster.metadata.sorted_tables,
+                                  SqlAlchemyRuleSet.create())
+
+
+def test_parallel_same_as_serial():
+    metadata = create_metadata()
+    serial = generate(metadata, length=50, seed=1)
+    parallel = generate(metadata, length=50, seed=1, workers=3)
+    assert sorted(serial.keys()) == ['m_area.csv', 'm_product.csv',
+                                     'm_stage.csv', 'm_term.csv']
+    assert serial == parallel
+    assert generate(metadata, length=50, seed=2) != serial
+
+
+def test_sharded_same_as_serial():
+    metadata = create_metadata()
+    serial = generate(metadata, length=95, seed=1, shard_size=20)
+    sharded = generate(metadata, length=95, seed=1, shard_size=20, workers=3)
+    assert sharded == serial
+    assert serial['m_area.csv'].count('\n') == 96
+    for filename in ('m_area.csv', 'm_product.csv', 'm_stage.csv', 'm_term.csv'):
+        ids = [line.split(',')[0] for line in serial[filename].splitlines()[1:]]
+        assert ids == [str(i) for i in range(1, 96)]
+
+
+def test_random_access():
+    metadata = create_metadata()
+    serial = generate(metadata, length=30, seed=1, random_access=True)
+    sharded = generate(metadata, length=30, seed=1, random_access=True,
+                       shard_size=7, workers=2)
+    assert sharded == serial
+
+    table = metadata.tables['m_product']
+    table.set_row_seed(5)
+    rows = list(table.generate(30))
+    assert list(table.generate_range(20, 25)) == rows[20:25]
+
+
+def test_table_lengths():
+    metadata = create_metadata()
+    lengths = {'m_area': 12, 'm_stage': 'm_area*2.5', 'm_term': '3'}
+    serial = generate(metadata, length=5, seed=1, table_lengths=lengths)
+    assert [len(serial[name].splitlines()) - 1
+            for name in ('m_area.csv', 'm_stage.csv', 'm_term.csv', 'm_product.csv')] == [12, 30, 3, 5]
+    area_ids = set(line.split(',')[1] for line in serial['m_stage.csv'].splitlines()[1:])
+    assert area_ids <= set(str(i) for i in range(1, 13))
+    assert (generate(metadata, length=5, seed=1, table_lengths=lengths,
+                     shard_size=7, workers=2) ==
+            generate(metadata, length=5, seed=1, table_lengths=lengths, shard_size=7))
+    python = generate(metadata, length=5, seed=1, table_lengths=lengths, format='python')
+    assert python['dummydata.py'].count("'area_id'") == 30
+
+    with pytest.raises(ValueError):
+        generate(metadata, table_lengths={'m_area': 'm_stage*2', 'm_stage': 'm_area*2'})
+    for lengths in ({'m_arae': 3}, {'m_stage': 'm_arae*2'}):
+        with pytest.raises(ValueError):
+            generate(metadata, table_lengths=lengths)
+
+    # rounded to 0 rows
+    lengths = {'m_stage': 'm_area*0.01'}
+    assert generate(metadata, length=10, table_lengths=lengths)['m_stage.csv'].count('\n') == 1
+    python = generate(metadata, length=10, seed=1, table_lengths=lengths, format='python')
+    assert 'm_stage = [\n]\n' in python['dummydata.py']
+
+
+def _peak_memory(metadata, length, formatter_class):
+    dirname = tempfile.mkdtemp()
+    try:
+        formatter = formatter_class(dirname, length)
+        formatter.batch_size = 500
+        generator = DataGenerator(metadata=metadata, directory=dirname,
+                                  table_names=['m_stage', 'm_term'],
+                                  formatter=formatter, seed=1)
+        tracemalloc.start()
+        try:
+            generator.generate()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return current, peak
+    finally:
+        shutil.rmtree(dirname)
+
+
+@pytest.mark.parametrize('formatter_class', [CsvFormatter, PythonFormatter])
+def test_constant_memory(formatter_class):
+    """memory does not grow with the number of rows, and nothing is kept in metadata"""
+    metadata = create_metadata()
+    _peak_memory(metadata, 500, formatter_class)
+    small_current, small_peak = _peak_memory(metadata, 1000, formatter_class)
+    large_current, large_peak = _peak_memory(metadata, 4000, formatter_class)
+    assert large_peak < small_peak * 1.2 + 65536
+    assert large_current < small_current + 65536
+
+
+class FailingFormatter(CsvFormatter):
+    """fails after writing part of the ``fail_at`` th shard"""
+    def __init__(self, directory, length, fail_at):
+        super(FailingFormatter, self).__init__(directory, length)
+        self._calls = 0
+        self._fail_at = fail_at
+
+    def write_file(self, dataschema, file_handle, start=0, stop=None):
+        self._calls += 1
+        if self._calls == self._fail_at:
+            file_handle.write('partial row')
+            raise RuntimeError('killed')
+        super(FailingFormatter, self).write_file(dataschema, file_handle, start, stop)
+
+
+def _outputs(dirname):
+    result = read_outputs(dirname)
+    del result[CHECKPOINT_FILENAME]
+    return result
+
+
+def test_checkpoint_resume():
+    metadata = create_metadata()
+    expected = generate(metadata, length=45, seed=1, shard_size=20)
+    dirname = tempfile.mkdtemp()
+    try:
+        generator = DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                                  formatter=FailingFormatter(dirname, 45, fail_at=5),
+                                  length=45, seed=1, shard_size=20, checkpoint=True)
+        with pytest.raises(RuntimeError):
+            generator.generate()
+        with pytest.raises(ValueError):
+            DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                          seed=2, resume=True).generate()
+        DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                      resume=True).generate()
+        assert _outputs(dirname) == expected
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_checkpoint_append():
+    metadata = create_metadata()
+    dirname = tempfile.mkdtemp()
+    try:
+        DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                      length=30, seed=1, shard_size=20, checkpoint=True).generate()
+        first = _outputs(dirname)
+        DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                      length=25, append=True, table_lengths={'m_term': 5}).generate()
+        appended = _outputs(dirname)
+    finally:
+        shutil.rmtree(dirname)
+    for filename, text in appended.items():
+        assert text.startswith(first[filename])
+    assert [len(appended[name].splitlines()) - 1
+            for name in ('m_area.csv', 'm_stage.csv', 'm_term.csv')] == [55, 55, 35]
+    ids = [line.split(',')[0] for line in appended['m_stage.csv'].splitlines()[1:]]
+    assert ids == [str(i) for i in range(1, 56)]
+    area_ids = set(line.split(',')[1] for line in appended['m_stage.csv'].splitlines()[1:])
+    assert area_ids <= set(str(i) for i in range(1, 56))
+
+
+coded = SAMetaData()
+SATable('parent', coded, SAColumn('code', String(2), primary_key=True))
+SATable('child', coded,
+        SAColumn('id', Integer, primary_key=True),
+        SAColumn('parent_code', String(2), ForeignKey('parent.code')))
+
+
+def _coded_keys(outputs):
+    codes = outputs['parent.csv'].splitlines()[1:]
+    parent_codes = [line.split(',')[1] for line in outputs['child.csv'].splitlines()[1:]]
+    return codes, parent_codes
+
+
+def test_checkpoint_drawn_keys():
+    metadata = from_sqlalchemy_tables(coded.sorted_tables, SqlAlchemyRuleSet.create())
+    expected = generate(metadata, length=60, seed=1, shard_size=20)
+    dirname = tempfile.mkdtemp()
+    try:
+        generator = DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                                  formatter=FailingFormatter(dirname, 60, fail_at=5),
+                                  length=60, seed=1, shard_size=20, checkpoint=True)
+        with pytest.raises(RuntimeError):
+            generator.generate()
+        DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                      resume=True).generate()
+        assert _outputs(dirname) == expected
+
+        DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                      length=30, append=True).generate()
+        codes, parent_codes = _coded_keys(_outputs(dirname))
+    finally:
+        shutil.rmtree(dirname)
+    assert len(codes) == 90
+    assert len(set(codes)) == 90
+    assert len(parent_codes) == 90
+    assert set(parent_codes) <= set(codes)
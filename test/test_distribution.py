@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from datetime import datetime, timedelta
+import os
+import random
+import shutil
+import tempfile
+import pytest
+from sqlalchemy import (Boolean, Column, DateTime, Float, ForeignKey, Integer,
+                        MetaData, String, Table, create_engine)
+from testdatautil.dataset import from_sqlalchemy_tables
+from testdatautil.distribution import (ProfiledFactory, load_profiles,
+                                       profile_database, save_profiles)
+from testdatautil.rule import ProfiledRuleSet
+
+meta = MetaData()
+account = Table('account', meta,
+                Column('id', Integer, primary_key=True),
+                Column('status', String(10)),
+                Column('name', String(30)),
+                Column('amount', Integer),
+                Column('score', Float),
+                Column('premium', Boolean),
+                Column('created', DateTime),
+                Column('parent_id', Integer, ForeignKey('account.id')))
+
+START = datetime(2020, 1, 1)
+
+
+def source_rows(count):
+    rng = random.Random(1)
+    for index in range(count):
+        yield {
+            'id': index + 1,
+            'status': rng.choices(['active', 'closed', 'suspended'], [95, 4, 1])[0],
+            'name': None if rng.random() < 0.3 else
+                    ''.join(rng.choice('abc') for _ in range(rng.randint(3, 20))),
+            'amount': int(rng.expovariate(1 / 1000.0)),
+            'score': rng.gauss(50, 10),
+            'premium': rng.random() < 0.1,
+            'created': START + timedelta(seconds=rng.randint(0, 86400 * 365)),
+            'parent_id': None,
+        }
+
+
+def test_profile_and_replay():
+    dirname = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(dirname, 'source.db'))
+        meta.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(account.insert(), list(source_rows(3000)))
+        profiles = profile_database(engine, sample_size=2000)
+        path = os.path.join(dirname, 'profiles.json')
+        save_profiles(path, profiles)
+        profiles = load_profiles(path)
+    finally:
+        shutil.rmtree(dirname)
+
+    columns = profiles['account']
+    assert columns['name']['null_rate'] == pytest.approx(0.3, abs=0.05)
+    assert columns['status']['top'][0][0] == 'active'
+    assert columns['status']['top'][0][1] == pytest.approx(0.95, abs=0.02)
+    assert 'lengths' in columns['name']
+    assert 'histogram' in columns['amount']
+    assert columns['created']['min'] >= START.isoformat()
+    assert columns['created']['max'] < (START + timedelta(days=366)).isoformat()
+
+    metadata = from_sqlalchemy_tables([account], ProfiledRuleSet.create(profiles))
+    table = metadata.tables['account']
+    assert isinstance(table['status'].factory, ProfiledFactory)
+    assert not isinstance(table['parent_id'].factory, ProfiledFactory)
+    table.set_seed(1)
+    rows = next(table.generate_range(0, 5000).batches(5000))
+    rows = dict((name, list(values)) for name, values in rows.items())
+
+    assert rows['id'] == list(range(1, 5001))
+    assert rows['status'].count('active') / 5000 == pytest.approx(0.95, abs=0.02)
+    assert set(rows['status']) <= {'active', 'closed', 'suspended'}
+    names = [name for name in rows['name'] if name is not None]
+    assert len(names) / 5000 == pytest.approx(0.7, abs=0.05)
+    assert all(3 <= len(name) <= 20 for name in names)
+    amounts = rows['amount']
+    assert all(isinstance(amount, int) for amount in amounts)
+    assert sum(amounts) / len(amounts) == pytest.approx(1000, rel=0.15)
+    assert sum(rows['premium']) / 5000 == pytest.approx(0.1, abs=0.02)
+    assert all(START <= created < START + timedelta(days=366) for created in rows['created'])
+
+    # same values row by row from counter based streams
+    table.set_row_seed(3)
+    batch = next(table.generate_range(10, 20).batches(10))
+    assert list(table.generate_range(10, 20)) == [
+        dict((name, values[offset]) for name, values in batch.items())
+        for offset in range(10)]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import shutil
+import tempfile
+import pytest
+from testdatautil.datagenerator import DataGenerator, FixtureFormatter
+from testdatautil.factory import to_list
+from testdatautil.fixture import load_fixtures
+from .test_datagenerator import create_metadata, generate
+
+
+def test_fixture_format():
+    metadata = create_metadata()
+    dirname = tempfile.mkdtemp()
+    try:
+        formatter = FixtureFormatter(dirname, 25)
+        formatter.batch_size = 10
+        generator = DataGenerator(metadata=metadata, directory=dirname, table_names=None,
+                                  formatter=formatter, seed=1)
+        generator.generate()
+        fixtures = load_fixtures(dirname)
+        assert fixtures.keys() == ['m_area', 'm_product', 'm_stage', 'm_term']
+        for name in fixtures.keys():
+            schema = metadata.tables[name]
+            schema.set_seed(generator.table_seed(name))
+            expected = []
+            for batch in formatter.batches(schema):
+                expected.extend(zip(*[to_list(values) for values in batch.values()]))
+            table = fixtures[name]
+            assert table.columns == schema.keys()
+            assert len(table) == 25
+            assert list(table) == expected
+            assert list(table.dicts())[3] == dict(zip(schema.keys(), expected[3]))
+            assert table[12] == expected[12]
+            assert table[-1] == expected[-1]
+            assert [table[i] for i in (3, 4, 17, 0, 24)] == [expected[i] for i in (3, 4, 17, 0, 24)]
+            with pytest.raises(IndexError):
+                table[25]
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_fixture_shards_concatenated():
+    metadata = create_metadata()
+    serial = generate(metadata, raw=True, length=30, seed=1, shard_size=7,
+                      format='fixture')
+    sharded = generate(metadata, raw=True, length=30, seed=1, shard_size=7,
+                       format='fixture', workers=2)
+    assert sharded == serial
+
+
+def test_fixture_not_compressed():
+    with pytest.raises(ValueError):
+        DataGenerator(metadata=create_metadata(), directory='.', table_names=None,
+                      format='fixture', length=5, compress='gzip')
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import csv
+import io
+import numpy
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table
+from testdatautil.dataset import from_sqlalchemy_tables
+from testdatautil.factory import ForeignKeyFactory
+from testdatautil.keypool import ArrayKeyPool, RangeKeyPool
+from testdatautil.rule import SqlAlchemyRuleSet
+from .test_datagenerator import create_metadata, generate
+
+meta = MetaData()
+country = Table('country', meta,
+                Column('code', String(10), primary_key=True, unique=True))
+city = Table('city', meta,
+             Column('id', Integer, primary_key=True),
+             Column('country_code', String(10), ForeignKey('country.code')))
+
+
+def read_csv(text, key):
+    return [row[key] for row in csv.DictReader(io.StringIO(text))]
+
+
+def test_range_key_pool():
+    pool = RangeKeyPool(1, 2)
+    pool.record(0, [1, 3, 5])
+    pool.record(3, numpy.array([7, 9]))
+    assert len(pool) == 5
+    assert pool[4] == 9
+    assert pool.take(numpy.array([0, 2])).tolist() == [1, 5]
+
+
+def test_array_key_pool():
+    pool = ArrayKeyPool()
+    pool.record(0, [10, 20])
+    pool.record(0, [10, 20])
+    pool.record(2, numpy.array([30]))
+    assert len(pool) == 3
+    assert pool.take(numpy.array([2, 0])).tolist() == [30, 10]
+    pool.record(3, ['a'])
+    assert [pool[i] for i in range(4)] == [10, 20, 30, 'a']
+
+
+def test_foreign_key_factory():
+    pool = RangeKeyPool(1, 1, 3)
+    factory = iter(ForeignKeyFactory(pool).generate(100))
+    assert set(factory) <= set([1, 2, 3])
+
+
+def test_foreign_key_generation():
+    metadata = create_metadata()
+    assert isinstance(metadata.tables['m_stage']['area_id'].factory, ForeignKeyFactory)
+    for kwargs in ({}, {'workers': 2}, {'workers': 2, 'random_access': True}):
+        outputs = generate(metadata, length=30, seed=1, **kwargs)
+        area_ids = set(read_csv(outputs['m_area.csv'], 'id'))
+        assert len(area_ids) == 30
+        assert set(read_csv(outputs['m_stage.csv'], 'area_id')) <= area_ids
+
+
+def test_foreign_key_array_pool():
+    metadata = from_sqlalchemy_tables(meta.sorted_tables, SqlAlchemyRuleSet.create())
+    assert isinstance(metadata.tables['country']['code'].key_pool, ArrayKeyPool)
+    for kwargs in ({}, {'workers': 2}, {'workers': 2, 'random_access': True}):
+        outputs = generate(metadata, length=20, seed=1, **kwargs)
+        codes = set(read_csv(outputs['country.csv'], 'code'))
+        assert len(codes) == 20
+        assert set(read_csv(outputs['city.csv'], 'country_code')) <= codes
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import os
+import shutil
+import tempfile
+from datetime import date
+from sqlalchemy import (Column, ForeignKey, Integer, MetaData, String, Table,
+                        create_engine, text)
+from testdatautil.dataset import from_sqlalchemy_tables
+from testdatautil.plan import (load_or_build, load_plan, plan_key,
+                               rule_set_fingerprint, schema_fingerprint)
+from testdatautil.rule import SAEmail, SqlAlchemyRuleSet
+from .test_datagenerator import generate
+
+meta = MetaData()
+parent = Table('parent', meta,
+               Column('id', Integer, primary_key=True),
+               Column('name', String(20)))
+child = Table('child', meta,
+              Column('id', Integer, primary_key=True),
+              Column('parent_id', Integer, ForeignKey('parent.id')),
+              Column('code', String(10), unique=True))
+
+
+def test_plan_file():
+    dirname = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(dirname, 'test.db'))
+        meta.create_all(engine)
+        rule_set = SqlAlchemyRuleSet.create()
+        path = os.path.join(dirname, 'plan.gz')
+        key = plan_key(schema_fingerprint(engine), rule_set)
+        assert key == plan_key(schema_fingerprint(engine), rule_set)
+        built = []
+
+        def build():
+            built.append(True)
+            return from_sqlalchemy_tables(meta.sorted_tables, rule_set)
+
+        metadata = load_or_build(path, key, build)
+        loaded = load_or_build(path, key, build)
+        assert len(built) == 1
+        assert list(loaded.tables) == ['parent', 'child']
+        assert (generate(loaded, length=20, seed=3) ==
+                generate(metadata, length=20, seed=3))
+
+        # schema change invalidates the plan
+        with engine.begin() as connection:
+            connection.execute(text('ALTER TABLE child ADD COLUMN note VARCHAR(5)'))
+        new_key = plan_key(schema_fingerprint(engine), rule_set)
+        assert new_key != key
+        assert load_plan(path, new_key) is None
+        rule_set.add_rule(SAEmail())
+        assert plan_key(schema_fingerprint(engine), rule_set) != new_key
+        assert load_plan(os.path.join(dirname, 'missing.gz'), key) is None
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_rule_set_fingerprint_stable():
+    assert (rule_set_fingerprint(SqlAlchemyRuleSet.create()) ==
+            rule_set_fingerprint(SqlAlchemyRuleSet.create()))
+    basedate = date(2020, 1, 1)
+    fingerprint = rule_set_fingerprint(SqlAlchemyRuleSet.create(basedate=basedate))
+    assert fingerprint == rule_set_fingerprint(SqlAlchemyRuleSet.create(basedate=basedate))
+    assert fingerprint != rule_set_fingerprint(
+        SqlAlchemyRuleSet.create(basedate=date(2020, 1, 2)))
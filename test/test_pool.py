@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import copy
+import os
+import shutil
+import tempfile
+from testdatautil import pool
+from testdatautil.factory import PoolFactory
+from testdatautil.pool import ValuePool, value_pool
+from testdatautil.rule import SqlAlchemyRuleSet
+from testdatautil.dataset import from_sqlalchemy_tables
+from . import sample
+from .test_datagenerator import generate
+
+
+def test_value_pool_cache():
+    dirname = tempfile.mkdtemp()
+    try:
+        values = value_pool('email', 50, seed=1, cache_dir=dirname)
+        assert len(values) == 50
+        assert len(os.listdir(dirname)) == 1
+        # loaded from the disk cache
+        pool._pools.clear()
+        assert list(value_pool('email', 50, seed=1, cache_dir=dirname)) == list(values)
+        assert value_pool('email', 50, seed=1) is value_pool('email', 50, seed=1)
+        assert list(value_pool('email', 50, seed=2)) != list(values)
+    finally:
+        shutil.rmtree(dirname)
+
+
+def test_pool_factory():
+    values = ValuePool(['abcdef', 'ghijkl', 'mnopqr'])
+    factory = PoolFactory(values.truncated(3))
+    assert copy.deepcopy(factory)._pool is factory._pool
+    factory.seed_rows(7)
+    batch = factory.batch(20).tolist()
+    assert set(batch) <= {'abc', 'ghi', 'mno'}
+    rows = PoolFactory(values.truncated(3))
+    rows.seed_rows(7)
+    row_values = []
+    for _ in range(20):
+        row_values.append(rows())
+        rows.increase_index()
+    assert row_values == batch
+
+
+def test_pooled_rules():
+    rule_set = SqlAlchemyRuleSet.create(pool_size=100)
+    metadata = from_sqlalchemy_tables(sample.BaseMaster.metadata.sorted_tables,
+                                      rule_set)
+    factories = [column.factory for column in metadata.tables['m_area'].columns]
+    assert any(isinstance(factory, PoolFactory) for factory in factories)
+    assert (generate(metadata, length=30, seed=5, workers=2) ==
+            generate(metadata, length=30, seed=5))
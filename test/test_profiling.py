@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import json
+import os
+import shutil
+import tempfile
+from testdatautil import profiling
+from testdatautil.cli import execute_from_command_line
+from .test_datagenerator import create_metadata, generate
+
+
+def profile(**kwargs):
+    profiler = profiling.enable(sample_interval=3)
+    try:
+        generate(create_metadata(), length=20, seed=1, **kwargs)
+    finally:
+        profiling.disable()
+    return dict(((item['kind'], item['table'], item['name']), item)
+                for item in profiler.report())
+
+
+def test_profile_batches():
+    stats = profile()
+    assert stats[('table', 'm_area', None)]['rows'] == 20
+    assert stats[('column', 'm_area', 'name')]['rows'] == 20
+    assert stats[('write', 'm_area', 'CsvFormatter')]['rows'] == 20
+    assert profiling.active is None
+
+
+def test_profile_rows():
+    stats = profile(format='python')
+    column = stats[('column', 'm_area', 'name')]
+    assert column['calls'] == 20
+    assert column['time'] > 0
+
+
+def test_profile_workers():
+    stats = profile(workers=2)
+    assert stats[('column', 'm_stage', 'area_id')]['rows'] == 20
+
+
+def test_cli_profile():
+    dirname = tempfile.mkdtemp()
+    try:
+        path = os.path.join(dirname, 'profile.json')
+        argv = ['-o{}'.format(dirname), '-r5', '--profile', path]
+        execute_from_command_line(metadata=create_metadata(), argv=argv)
+        with open(path) as fio:
+            report = json.load(fio)
+        times = [item['time'] for item in report['stats']]
+        assert times == sorted(times, reverse=True)
+    finally:
+        shutil.rmtree(dirname)
@@ -37,3 +37,40 @@ def test_ruleset():
 
     res = rule_set.match(rule_set.rules, 3, None)
     assert "3" == res
+
+    # cached rules can not be changed outside add_rule
+    rules = rule_set.rules
+    assert isinstance(rules, tuple)
+    rule_set.add_rule(RuleBy2(), priority=100)
+    assert len(rules) == 2
+    assert rule_set.match(rule_set.rules, 6, None) == "2"
+
+
+def test_rule_index():
+    from sqlalchemy import Column, Integer, MetaData, String, Table
+    from testdatautil.rule import SqlAlchemyRuleSet, SAFieldNameRule
+    from test import sample
+
+    class NoteRule(SAFieldNameRule):
+        fieldname = 'note'
+
+        def build(self, field):
+            return "note"
+
+    rule_set = SqlAlchemyRuleSet.create()
+    index = rule_set.compile()
+    assert rule_set.compile() is index
+    rule_set.add_rule(NoteRule(), priority=20000)
+    assert rule_set.compile() is not index
+
+    extra = Table('extra', MetaData(),
+                  Column('extra_id', Integer, primary_key=True),
+                  Column('note', String(10)),
+                  Column('user_name', String(10)),
+                  Column('mail_email', String(10)))
+    tables = list(sample.BaseMaster.metadata.sorted_tables) + [extra]
+    for table in tables:
+        for field in table.columns:
+            expected = rule_set.find_rule(rule_set.rules, field)
+            assert rule_set.compile().find_rule(field) is expected
+    assert isinstance(rule_set.compile().find_rule(extra.c.note), NoteRule)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from datetime import date, datetime, timedelta
+import random
+from testdata import Factory
+from testdatautil.factory import (BatchCountingFactory, BatchDateInterval,
+                                  BatchRandomDate, BatchRandomInteger,
+                                  BatchRandomSelection,
+                                  PrefixedCountingFactory, to_list)
+from testdatautil.schema import Column, MetaData, Table
+
+
+class Doubling(Factory):
+    def __call__(self):
+        return self.current_index * 2
+
+
+def create_table():
+    return Table('t', MetaData(),
+                 Column('id', BatchCountingFactory(1)),
+                 Column('code', PrefixedCountingFactory('c_')),
+                 Column('num', BatchRandomInteger(0, 9)),
+                 Column('day', BatchDateInterval(date(2015, 1, 1), timedelta(hours=12))),
+                 Column('at', BatchRandomDate(datetime(2015, 1, 1), datetime(2015, 1, 2))),
+                 Column('double', Doubling()))
+
+
+def test_generate_batch():
+    table = iter(create_table().generate(5))
+    batch = table.generate_batch(3)
+    assert list(batch.keys()) == ['id', 'code', 'num', 'day', 'at', 'double']
+    assert to_list(batch['id']) == [1, 2, 3]
+    assert to_list(batch['code']) == ['c_0', 'c_1', 'c_2']
+    assert all(0 <= val <= 9 for val in to_list(batch['num']))
+    assert to_list(batch['day']) == [date(2015, 1, 1), date(2015, 1, 1), date(2015, 1, 2)]
+    assert all(datetime(2015, 1, 1) <= val <= datetime(2015, 1, 2)
+               for val in to_list(batch['at']))
+    assert batch['double'] == [0, 2, 4]
+
+    batch = table.generate_batch(2)
+    assert to_list(batch['id']) == [4, 5]
+    assert batch['double'] == [6, 8]
+
+
+def test_batches_match_rows():
+    table = create_table()
+    rows = list(table.generate(7))
+    columns = dict((key, []) for key in table.keys())
+    for batch in table.generate(7).batches(3):
+        for key, values in batch.items():
+            columns[key].extend(to_list(values))
+
+    for key in ('id', 'code', 'day', 'double'):
+        assert columns[key] == [row[key] for row in rows]
+    assert len(columns['num']) == 7
+
+
+def test_generate_range():
+    table = create_table()
+    rows = list(table.generate(10))
+    part = list(table.generate_range(4, 7))
+    assert len(part) == 3
+    for key in ('id', 'code', 'day', 'double'):
+        assert [row[key] for row in part] == [row[key] for row in rows[4:7]]
+
+
+def test_set_seed():
+    table = create_table()
+    table.set_seed(1, interval=4)
+    rows = list(table.generate(10))
+    assert list(table.generate_range(4, 8)) == rows[4:8]
+
+
+def test_set_row_seed():
+    table = create_table()
+    table.set_row_seed(1)
+    rows = list(table.generate(10))
+    assert list(table.generate_range(6, 9)) == rows[6:9]
+
+    columns = dict((key, []) for key in table.keys())
+    for batch in table.generate_range(3, 10).batches(4):
+        for key, values in batch.items():
+            columns[key].extend(to_list(values))
+    for key in table.keys():
+        assert columns[key] == [row[key] for row in rows[3:]]
+
+    other = create_table()
+    other.set_row_seed(2)
+    assert list(other.generate(10)) != rows
+
+
+class RandomPick(Factory):
+    def __call__(self):
+        return random.randint(0, 10 ** 9)
+
+
+def test_set_seed_after_row_seed():
+    def create():
+        return Table('t', MetaData(),
+                     Column('num', BatchRandomInteger(0, 10 ** 9)),
+                     Column('pick', RandomPick()))
+
+    table = create()
+    table.set_row_seed(1)
+    row_seeded = list(table.generate(5))
+    table.set_seed(2)
+    expected = create()
+    expected.set_seed(2)
+    rows = list(table.generate(5))
+    assert rows == list(expected.generate(5))
+    for key in ('num', 'pick'):
+        assert [row[key] for row in rows] != [row[key] for row in row_seeded]
+
+
+def test_batch_selection_keeps_types():
+    for choices in (['a', 1], [1, 2.5], [True, 'x', None], ['a', 'b']):
+        factory = BatchRandomSelection(choices)
+        factory.seed_rows(5)
+        batch = to_list(factory.batch(50))
+        rows = BatchRandomSelection(choices)
+        rows.seed_rows(5)
+        values = []
+        for _ in range(50):
+            values.append(rows())
+            rows.increase_index()
+        assert values == batch
+        assert [type(value) for value in values] == [type(value) for value in batch]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from collections import OrderedDict
+from datetime import date, datetime
+import json
+from testdatautil.serializer import (compile_json_encoder, compile_json_template,
+                                     compile_serializer, format_value)
+
+
+def test_compile_serializer():
+    samples = [
+        (int, [1, None, -3]),
+        (float, [0.5, None, 12.25]),
+        (str, ['a', None, 'bc']),
+        (bool, [True, None, False, 1, 0]),
+        (datetime, [datetime(2015, 1, 2, 3, 4, 5, 678), None, datetime(2015, 1, 2)]),
+        (date, [date(2015, 1, 2), None]),
+        (None, [datetime(2015, 1, 2, 3, 4, 5), date(2015, 1, 2), None, True, 'x', 3]),
+    ]
+    for python_type, values in samples:
+        serialize = compile_serializer(python_type)
+        assert serialize(values) == [format_value(val) for val in values]
+
+
+def test_json_encoder():
+    samples = [
+        (int, [1, None, -3], [1, None, -3]),
+        (float, [0.5, None], [0.5, None]),
+        (float, [float('nan'), float('inf'), -float('inf'), 1.5], [None, None, None, 1.5]),
+        (str, ['a"あ', None], ['a"あ', None]),
+        (bool, [1, 0, None], [True, False, None]),
+        (datetime, [datetime(2015, 1, 2, 3, 4, 5, 6)], ['2015-01-02 03:04:05']),
+        (date, [date(2015, 1, 2), date(2015, 1, 2), None], ['2015-01-02', '2015-01-02', None]),
+        (None, [date(2015, 1, 2), True, 'x', 3, None], ['2015-01-02', True, 'x', 3, None]),
+        (None, [float('nan'), 0.5], [None, 0.5]),
+    ]
+    for python_type, values, expected in samples:
+        encoded = compile_json_encoder(python_type)(values)
+        assert [json.loads(text) for text in encoded] == expected
+
+
+def test_json_template():
+    template = compile_json_template(['id', 'na"me{}'])
+    line = template.format('1', '"x"')
+    assert json.loads(line, object_pairs_hook=OrderedDict) == OrderedDict([('id', 1), ('na"me{}', 'x')])
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import csv
+import io
+import sqlite3
+from sqlalchemy import create_engine
+from testdatautil.serializer import SQL_DIALECTS, _compile_sql_encoder
+from . import sample
+from .test_datagenerator import create_metadata, generate
+
+
+def test_sql_format():
+    metadata = create_metadata()
+    expected = generate(metadata, length=25, seed=2)
+    outputs = generate(metadata, length=25, seed=2, format='sql',
+                       rows_per_statement=10, statements_per_transaction=2)
+    script = outputs['m_area.sql']
+    assert script.count('INSERT INTO') == 3
+    assert script.count('COMMIT;') == 2
+
+    engine = create_engine('sqlite://')
+    sample.BaseMaster.metadata.create_all(engine)
+    connection = engine.raw_connection()
+    try:
+        for table_name in metadata.tables:
+            connection.executescript(outputs[table_name + '.sql'])
+            rows = list(csv.DictReader(io.StringIO(expected[table_name + '.csv'])))
+            keys = list(rows[0].keys())
+            cursor = connection.execute('SELECT {} FROM {} ORDER BY rowid'.format(
+                ', '.join(keys), table_name))
+            loaded = [['' if val is None else str(val) for val in row]
+                      for row in cursor.fetchall()]
+            assert loaded == [[row[key] for key in keys] for row in rows]
+    finally:
+        connection.close()
+
+
+def test_sql_quoting():
+    sqlite = SQL_DIALECTS['sqlite']
+    assert sqlite.quote_string("it's \\") == "'it''s \\'"
+    assert sqlite.quote_identifier('a"b') == '"a""b"'
+    mysql = SQL_DIALECTS['mysql']
+    assert mysql.quote_string("it's \\") == "'it''s \\\\'"
+    assert mysql.quote_identifier('order') == '`order`'
+    connection = sqlite3.connect(':memory:')
+    assert connection.execute('SELECT ' + sqlite.quote_string("it's")).fetchone() == ("it's",)
+
+
+def test_sql_non_finite_floats():
+    connection = sqlite3.connect(':memory:')
+    values = [float('nan'), float('inf'), -float('inf'), 1.5, None]
+    for python_type in (float, None):
+        encoded = _compile_sql_encoder(python_type, SQL_DIALECTS['sqlite'])(values)
+        assert encoded == ['NULL', 'NULL', 'NULL', '1.5', 'NULL']
+        row = connection.execute('SELECT ' + ', '.join(encoded)).fetchone()
+        assert row == (None, None, None, 1.5, None)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import warnings
+import pytest
+from sqlalchemy import (Column as SAColumn, Integer, MetaData as SAMetaData,
+                        String, Table as SATable, UniqueConstraint)
+from testdatautil.dataset import from_sqlalchemy_tables
+from testdatautil.factory import BatchRandomInteger, to_list
+from testdatautil.rule import SqlAlchemyRuleSet
+from testdatautil.schema import Column, MetaData, Table
+from testdatautil.unique import UniqueFactory, ValueSet
+from .test_datagenerator import generate
+
+meta = SAMetaData()
+entry = SATable('entry', meta,
+                SAColumn('code', String(3), primary_key=True),
+                SAColumn('a', Integer),
+                SAColumn('b', Integer),
+                UniqueConstraint('a', 'b'))
+
+
+def test_value_set():
+    values = ValueSet(capacity=1000)
+    values.exact_limit = 100
+    assert all(values.add(i) for i in range(1000))
+    assert not any(values.add(i) for i in range(1000))
+
+
+def test_unique_factory():
+    for batch in (False, True):
+        factory = iter(UniqueFactory(BatchRandomInteger(0, 49)).generate(50))
+        if batch:
+            values = to_list(factory.batch(30)) + to_list(factory.batch(20))
+        else:
+            values = list(factory)
+        assert sorted(values) == list(range(50))
+
+
+def test_unique_factory_value_space():
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        factory = iter(UniqueFactory(BatchRandomInteger(0, 9), name='num').generate(11))
+    assert 'unique num' in str(caught[0].message)
+    with pytest.raises(ValueError):
+        list(factory)
+
+
+def create_table():
+    return Table('t', MetaData(),
+                 Column('a', BatchRandomInteger(0, 4)),
+                 Column('b', BatchRandomInteger(0, 4)),
+                 unique_together=[('a', 'b')])
+
+
+def test_unique_together():
+    table = create_table()
+    rows = [(row['a'], row['b']) for row in table.generate(25)]
+    assert len(set(rows)) == 25
+
+    table.set_row_seed(1)
+    instance = table.generate(25)
+    rows = []
+    for batch in instance.batches(10):
+        rows.extend(zip(to_list(batch['a']), to_list(batch['b'])))
+    assert len(set(rows)) == 25
+
+
+def test_sqlalchemy_unique():
+    metadata = from_sqlalchemy_tables([entry], SqlAlchemyRuleSet.create())
+    table = metadata.tables['entry']
+    assert isinstance(table['code'].factory, UniqueFactory)
+    assert table.unique_together == [('a', 'b')]
+    rows = list(table.generate(500))
+    assert len(set(row['code'] for row in rows)) == 500
+    assert len(set((row['a'], row['b']) for row in rows)) == 500
+
+
+code = SATable('code', SAMetaData(),
+               SAColumn('code', String(2), primary_key=True),
+               SAColumn('a', Integer),
+               SAColumn('b', Integer),
+               UniqueConstraint('a', 'b'))
+
+
+@pytest.mark.parametrize('options', [
+    dict(shard_size=50),
+    dict(workers=2),
+    dict(shard_size=50, workers=2),
+    dict(shard_size=50, workers=2, random_access=True),
+])
+def test_unique_across_shards(options):
+    metadata = from_sqlalchemy_tables([code], SqlAlchemyRuleSet.create())
+    serial_options = dict((name, value) for name, value in options.items()
+                          if name != 'workers')
+    serial = generate(metadata, length=300, seed=1, **serial_options)['code.csv']
+    output = generate(metadata, length=300, seed=1, **options)['code.csv']
+    rows = [line.split(',') for line in output.splitlines()[1:]]
+    assert len(rows) == 300
+    assert len(set(row[0] for row in rows)) == 300
+    assert len(set((row[1], row[2]) for row in rows)) == 300
+    if 'workers' in options:
+        assert output == serial
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from collections import Counter
+import io
+import os
+import shutil
+import tempfile
+import numpy
+import pytest
+from testdatautil.factory import WeightedChoiceFactory
+from testdatautil.rule import WeightedChoice
+from testdatautil.unique import value_space
+from testdatautil.weighted import AliasTable, load_weights
+
+
+def test_alias_table():
+    weights = [95, 3, 1.5, 0.5, 0]
+    table = AliasTable(weights)
+    assert table.probabilities() == pytest.approx([w / 100 for w in weights])
+    indexes = table.sample_array(numpy.random.RandomState(1).random_sample(100000))
+    counts = numpy.bincount(indexes, minlength=len(weights)) / 100000
+    assert counts == pytest.approx([w / 100 for w in weights], abs=0.005)
+    uniforms = numpy.linspace(0, 1, 1000, endpoint=False)
+    assert [table.sample(u) for u in uniforms.tolist()] == table.sample_array(uniforms).tolist()
+
+    for invalid in ([], [1, -1], [0, 0]):
+        with pytest.raises(ValueError):
+            AliasTable(invalid)
+
+
+def test_weighted_choice_factory():
+    factory = WeightedChoiceFactory(['active', 'suspended', 'closed'], [95, 4, 1])
+    factory.seed_rows(3)
+    batch = factory.batch(5000).tolist()
+    rows = WeightedChoiceFactory(['active', 'suspended', 'closed'], [95, 4, 1])
+    rows.seed_rows(3)
+    values = []
+    for _ in range(5000):
+        values.append(rows())
+        rows.increase_index()
+    assert values == batch
+    counts = Counter(batch)
+    assert 0.93 < counts['active'] / 5000 < 0.97
+    assert value_space(factory) == 3
+    assert value_space(WeightedChoiceFactory([1, 0], [1, 0])) == 1
+
+    # values of mixed types are not converted by numpy
+    factory = WeightedChoiceFactory(['x', 7, 2.5], [1, 1, 1])
+    factory.seed_rows(3)
+    batch = factory.batch(100).tolist()
+    rows = WeightedChoiceFactory(['x', 7, 2.5], [1, 1, 1])
+    rows.seed_rows(3)
+    values = []
+    for _ in range(100):
+        values.append(rows())
+        rows.increase_index()
+    assert [(type(value), value) for value in batch] == [(type(value), value) for value in values]
+
+
+def test_weights_from_file():
+    dirname = tempfile.mkdtemp()
+    try:
+        csv_path = os.path.join(dirname, 'status.csv')
+        with io.open(csv_path, 'w', encoding='utf-8') as fio:
+            fio.write('status,count\nactive,950\nclosed,50\n')
+        json_path = os.path.join(dirname, 'status.json')
+        with io.open(json_path, 'w', encoding='utf-8') as fio:
+            fio.write('{"active": 950, "closed": 50}')
+        assert list(load_weights(csv_path).items()) == [('active', 950), ('closed', 50)]
+        assert load_weights(json_path) == load_weights(csv_path)
+        factory = WeightedChoice.from_file(csv_path).build(None)
+        assert factory._choices == ['active', 'closed']
+    finally:
+        shutil.rmtree(dirname)
@@ -2,3 +2,5 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
+
+__version__ = '0.0.1'
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""python -m testdatautil --db-url URL [options]
+
+generate data for the tables reflected from the database.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from .cli import execute_from_command_line
+
+if __name__ == '__main__':
+    execute_from_command_line()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""generated datasets cached on disk
+
+a dataset is written in the fixture format (see ``fixture``) to a directory
+named by a hash of the schema, the rules, the seed, the row counts and the
+versions of testdatautil and Faker.
+processes sharing the cache (e.g. pytest-xdist workers) build a dataset
+once: the build holds a file lock, and the directory is renamed into place
+when complete.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from contextlib import contextmanager
+import json
+import os
+import shutil
+import tempfile
+import time
+from . import __version__
+from .fixture import MAGIC, load_fixtures
+from .plan import PLAN_VERSION, _digest, rule_set_fingerprint, tables_fingerprint
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path):
+    """exclusive lock of ``path`` between processes"""
+    with open(path, 'a+b') as fio:
+        if fcntl is not None:
+            fcntl.flock(fio.fileno(), fcntl.LOCK_EX)
+        else:  # pragma: no cover
+            while True:
+                try:
+                    msvcrt.locking(fio.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fio.fileno(), fcntl.LOCK_UN)
+            else:  # pragma: no cover
+                fio.seek(0)
+                msvcrt.locking(fio.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def cached_directory(cache_dir, key, build, rebuild=False):
+    """directory ``key`` of ``cache_dir``, written by ``build(directory)`` if missing
+
+    :param rebuild: build again even if cached
+    """
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    path = os.path.join(cache_dir, key)
+    if os.path.isdir(path) and not rebuild:
+        return path
+    with file_lock(path + '.lock'):
+        if os.path.isdir(path):
+            if not rebuild:
+                # built by another process while waiting
+                return path
+            shutil.rmtree(path)
+        temp_path = tempfile.mkdtemp(dir=cache_dir, prefix=key + '.')
+        try:
+            build(temp_path)
+            os.rename(temp_path, path)
+        except BaseException:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+    return path
+
+
+class DatasetSpec(object):
+    """tables, rules and row counts of a generated dataset
+
+    :param tables: SQLAlchemy Table objects, parents first
+    :param rule_set: rule set building factories of columns.
+        ``SqlAlchemyRuleSet.create()`` if None
+    :param length: number of rows of each table
+    :param table_lengths: rows by table name, see ``DataGenerator``
+    """
+    def __init__(self, tables, rule_set=None, seed=0, length=10, table_lengths=None):
+        if rule_set is None:
+            from .rule import SqlAlchemyRuleSet
+            rule_set = SqlAlchemyRuleSet.create()
+        self.tables = list(tables)
+        self.rule_set = rule_set
+        self.seed = seed
+        self.length = length
+        self.table_lengths = dict(table_lengths or {})
+
+    def key(self):
+        """hash of the schema, rules, seed, row counts and package versions"""
+        import faker
+        lengths = json.dumps(sorted((name, '{}'.format(value))
+                                    for name, value in self.table_lengths.items()))
+        # generated values change with the versions
+        return _digest([str(PLAN_VERSION), MAGIC.decode('ascii').strip(),
+                        'testdatautil ' + __version__, 'faker ' + faker.VERSION,
+                        tables_fingerprint(self.tables),
+                        rule_set_fingerprint(self.rule_set),
+                        '{}'.format(self.seed), '{}'.format(self.length), lengths])
+
+    def build(self, directory):
+        from .datagenerator import DataGenerator
+        from .dataset import from_sqlalchemy_tables
+        metadata = from_sqlalchemy_tables(self.tables, self.rule_set)
+        DataGenerator(metadata=metadata, directory=directory, table_names=None,
+                      format='fixture', length=self.length, seed=self.seed,
+                      table_lengths=self.table_lengths).generate()
+
+
+class Dataset(object):
+    """tables of a generated dataset
+
+    ``dataset[name]`` is the list of rows (dicts) of the table, read once
+    and kept in memory. ``table(name)`` streams rows from the file.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self._fixtures = load_fixtures(directory)
+        self._rows = dict()
+
+    def keys(self):
+        return self._fixtures.keys()
+
+    def __contains__(self, name):
+        return name in self._fixtures
+
+    def table(self, name):
+        """``fixture.FixtureTable`` of the table"""
+        return self._fixtures[name]
+
+    def __getitem__(self, name):
+        rows = self._rows.get(name)
+        if rows is None:
+            rows = list(self._fixtures[name].dicts())
+            self._rows[name] = rows
+        return rows
+
+
+def load_dataset(spec, cache_dir, rebuild=False):
+    """dataset of ``spec``, generated into ``cache_dir`` if not cached"""
+    return Dataset(cached_directory(cache_dir, spec.key(), spec.build, rebuild=rebuild))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""checkpoint of a generation run
+
+rows of a table are generated in blocks, and random sources are reseeded
+at every block (``Table.set_seed``). counters restart from the row index
+(``Table.seek``). so the state of a run is the seed and, for each table,
+the number of rows written and the size of the output file at that point.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import json
+import os
+
+FILENAME = '.testdatautil-checkpoint.json'
+
+
+class Checkpoint(object):
+    """state of a generation run, saved to ``path``
+
+    each table has
+    - rows: rows written
+    - offset: size of the output file after ``rows`` rows
+    - origin: first row of the run. blocks are counted from here
+    - origins: first rows of this and previous runs
+    - length: rows of the table when the run is complete
+    """
+    def __init__(self, path, seed, shard_size, random_access, tables=None):
+        self.path = path
+        self.seed = seed
+        self.shard_size = shard_size
+        self.random_access = random_access
+        self.tables = tables or dict()
+
+    @classmethod
+    def load(cls, path):
+        """saved checkpoint, or None if ``path`` does not exist"""
+        if not os.path.exists(path):
+            return None
+        with open(path) as fio:
+            data = json.load(fio)
+        return cls(path, data['seed'], data['shard_size'], data['random_access'],
+                   data['tables'])
+
+    def save(self):
+        temp_path = '{}.tmp'.format(self.path)
+        with open(temp_path, 'w') as fio:
+            json.dump({'seed': self.seed, 'shard_size': self.shard_size,
+                       'random_access': self.random_access,
+                       'tables': self.tables}, fio, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def table(self, name):
+        return self.tables.setdefault(name, {'rows': 0, 'offset': 0, 'origin': 0,
+                                             'origins': [0], 'length': 0})
+
+    def runs(self, name):
+        """[(first row, stop), ...] rows of the table written by each run"""
+        state = self.table(name)
+        origins = state['origins']
+        stops = origins[1:] + [state['rows']]
+        return [(origin, stop) for origin, stop in zip(origins, stops) if stop > origin]
+
+    def is_complete(self, name):
+        state = self.tables.get(name)
+        return state is not None and state['rows'] >= state['length']
+
+    def update(self, name, rows, offset):
+        state = self.table(name)
+        state['rows'] = rows
+        state['offset'] = offset
+        self.save()
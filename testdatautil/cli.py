@@ -3,15 +3,18 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
 import argparse
+import json
 import os
 import sys
-from .datagenerator import DataGenerator
+from . import profiling
 
 
 class Command(object):
     def __init__(self, argv=None):
         self.argv = argv or sys.argv[1:]
         self.prog_name = os.path.basename(sys.argv[0])
+        if self.prog_name == '__main__.py':
+            self.prog_name = 'python -m testdatautil'
 
     def get_parser(self):
         parser = argparse.ArgumentParser(prog=self.prog_name)
@@ -19,30 +22,173 @@ class Command(object):
                             type=os.path.expanduser,
                             default=os.path.expanduser('./data'),
                             help="save directory")
-        parser.add_argument('-f', '--format', default='csv', choices=('csv', 'python', 'json'))
-        parser.add_argument('-s', '--sep', default=b',',
+        parser.add_argument('-f', '--format', default='csv',
+                            choices=('csv', 'python', 'json', 'sql', 'columnar',
+                                     'fixture', 'database'))
+        parser.add_argument('-s', '--sep', default=',',
                             help='csv option. delimiter')
         parser.add_argument('-r', '--repeat',
                             default=10, type=int)
+        parser.add_argument('--rows', action='append', default=[],
+                            metavar='TABLE=N', dest='table_rows',
+                            help='rows of a table, instead of --repeat. N is a number, '
+                                 'or PARENT*RATIO for a ratio to rows of another table')
+        parser.add_argument('--rows-config', dest='rows_config',
+                            help='JSON file of rows by table, e.g. {"m_stage": "m_area*5"}')
         parser.add_argument('--no-header',
                             dest='noheader',
                             action='store_true',
                             help='csv option. write column name')
         parser.add_argument('--tables', action='store', nargs='*')
+        parser.add_argument('-j', '--jobs', default=1, type=int,
+                            help='number of processes')
+        parser.add_argument('--seed', type=int,
+                            help='random seed')
+        parser.add_argument('--shard-size', dest='shard_size', type=int,
+                            help='split tables into shards of this number of rows')
+        parser.add_argument('--random-access', dest='random_access',
+                            action='store_true',
+                            help='generate each value from (seed, table, column, row)')
+        parser.add_argument('--compress', choices=('gzip', 'bz2', 'xz'),
+                            help='compress csv/json/sql output')
+        parser.add_argument('--db-url', dest='db_url',
+                            help='SQLAlchemy url of the database. tables are reflected from it '
+                                 'if not given by the script, and written to it by the database format')
+        parser.add_argument('--dialect', default='sqlite',
+                            choices=('sqlite', 'mysql', 'postgresql'),
+                            help='sql option. quoting of names and literals')
+        parser.add_argument('--rows-per-statement', dest='rows_per_statement',
+                            type=int, default=1000,
+                            help='sql option. rows of an INSERT statement')
+        parser.add_argument('--statements-per-transaction',
+                            dest='statements_per_transaction', type=int, default=100,
+                            help='sql option. statements committed at once')
+        parser.add_argument('--io-queue', dest='io_queue', type=float,
+                            help='write files in a background thread, with at most '
+                                 'this many MiB of data in flight')
+        parser.add_argument('--profile', nargs='?', const='profile.json',
+                            metavar='PATH',
+                            help='print time spent by tables, columns and formatters, '
+                                 'and write it as JSON (default: profile.json)')
+        parser.add_argument('--profile-interval', dest='profile_interval',
+                            type=int, default=100,
+                            help='profile option. time one of this number of per row calls')
+        parser.add_argument('--plan',
+                            help='generation plan file. reused while schema and rules are unchanged')
+        parser.add_argument('--distributions', metavar='PATH',
+                            help='JSON file of value distributions of columns. created by '
+                                 'sampling the database at --db-url if missing')
+        parser.add_argument('--checkpoint', nargs='?', const=True, metavar='PATH',
+                            help='record progress every --shard-size rows, to resume the run '
+                                 '(default: .testdatautil-checkpoint.json in the save directory)')
+        parser.add_argument('--resume', action='store_true',
+                            help='continue the run of the checkpoint')
+        parser.add_argument('--append', type=int, metavar='N',
+                            help='add N rows (or --rows) to each table of the completed run '
+                                 'of the checkpoint')
         return parser
 
+    def load_metadata(self, args, key, build):
+        """metadata from the plan file, or ``build()`` without --plan
+
+        :param key: plan key, see ``plan.plan_key``
+        """
+        if not args.plan:
+            return build()
+        from .plan import load_or_build
+        return load_or_build(args.plan, key, build)
+
+    def rule_set(self, args, engine):
+        """rules of reflected tables. with --distributions, values follow
+        the distributions of the columns of the database"""
+        from .rule import ProfiledRuleSet, SqlAlchemyRuleSet
+        if not args.distributions:
+            return SqlAlchemyRuleSet.create()
+        from .distribution import load_profiles, profile_database, save_profiles
+        if os.path.exists(args.distributions):
+            profiles = load_profiles(args.distributions)
+        else:
+            profiles = profile_database(engine)
+            save_profiles(args.distributions, profiles)
+        return ProfiledRuleSet.create(profiles)
+
+    def reflect_metadata(self, args):
+        """metadata of the tables of the database at --db-url"""
+        from sqlalchemy import MetaData, create_engine
+        from .dataset import from_sqlalchemy_tables
+        from .plan import plan_key, schema_fingerprint
+        if not args.db_url:
+            raise SystemExit('--db-url is required to reflect tables')
+        engine = create_engine(args.db_url)
+        rule_set = self.rule_set(args, engine)
+
+        def build():
+            meta = MetaData()
+            meta.reflect(bind=engine)
+            return from_sqlalchemy_tables(meta.sorted_tables, rule_set)
+
+        key = None
+        if args.plan:
+            key = plan_key(schema_fingerprint(engine), rule_set)
+        return self.load_metadata(args, key, build)
+
+    def table_lengths(self, args):
+        """rows by table name from --rows-config and --rows"""
+        lengths = dict()
+        if args.rows_config:
+            with open(args.rows_config) as fio:
+                lengths.update(json.load(fio))
+        for item in args.table_rows:
+            if '=' not in item:
+                raise SystemExit('--rows must be TABLE=N or TABLE=PARENT*RATIO: {}'.format(item))
+            name, value = item.split('=', 1)
+            lengths[name.strip()] = value
+        return lengths
+
     def execute(self, args, metadata):
-        if not os.path.exists(args.directory):
+        from .datagenerator import DataGenerator
+        if metadata is None:
+            metadata = self.reflect_metadata(args)
+        if args.format != 'database' and not os.path.exists(args.directory):
             print('create directory {}'.format(args.directory))
             os.mkdir(args.directory)
 
+        io_queue_size = None
+        if args.io_queue:
+            io_queue_size = int(args.io_queue * (1 << 20))
+        length = args.repeat
+        if args.append is not None:
+            length = args.append
         generator = DataGenerator(metadata=metadata, directory=args.directory,
                                   table_names=args.tables, sep=args.sep,
-                                  length=args.repeat,
+                                  length=length,
                                   format=args.format,
                                   write_header=not args.noheader,
+                                  workers=args.jobs,
+                                  seed=args.seed,
+                                  shard_size=args.shard_size,
+                                  random_access=args.random_access,
+                                  compress=args.compress,
+                                  db_url=args.db_url,
+                                  dialect=args.dialect,
+                                  rows_per_statement=args.rows_per_statement,
+                                  statements_per_transaction=args.statements_per_transaction,
+                                  io_queue_size=io_queue_size,
+                                  table_lengths=self.table_lengths(args),
+                                  checkpoint=args.checkpoint,
+                                  resume=args.resume,
+                                  append=args.append is not None,
                                   )
-        generator.generate()
+        if not args.profile:
+            generator.generate()
+            return
+        profiler = profiling.enable(args.profile_interval)
+        try:
+            generator.generate()
+        finally:
+            profiling.disable()
+        print(profiler.format_report())
+        profiler.write(args.profile)
 
 
 def execute_from_command_line(argv=None, metadata=None):
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""columnar binary format
+
+a table is written to a directory with a JSON manifest and files per column
+
+- numbers, booleans, dates and datetimes: ``.npy`` array of the values
+- strings: ``.offsets.npy`` (int64, rows + 1) and ``.data`` (utf-8 bytes).
+  value ``i`` is ``data[offsets[i]:offsets[i + 1]]``
+- nulls: ``.valid.npy`` validity bitmap (uint8, little bit order, 1 is valid).
+  written only if the column has nulls
+
+``read_columnar`` memory-maps the files, so no data is copied or parsed
+until it is accessed.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from datetime import datetime, date
+import io
+import json
+import os
+from .serializer import format_value
+try:
+    import numpy
+    from numpy.lib import format as npy_format
+except ImportError:  # pragma: no cover
+    numpy = None
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+_DTYPES = [
+    (bool, 'bool'),
+    (int, 'int64'),
+    (float, 'float64'),
+    (datetime, 'datetime64[us]'),
+    (date, 'datetime64[D]'),
+]
+
+
+def _infer_dtype(values, python_type):
+    """numpy dtype of the column, or None for strings
+
+    ``python_type`` of the column is used if known, otherwise values are inspected.
+    """
+    if python_type is not None:
+        types = set([python_type])
+    elif hasattr(values, 'dtype') and values.dtype != object:
+        return values.dtype
+    else:
+        types = set(type(val) for val in values if val is not None)
+    if types == set([int, float]):
+        return numpy.dtype('float64')
+    for python_type, dtype in _DTYPES:
+        if types == set([python_type]):
+            return numpy.dtype(dtype)
+    return None
+
+
+class _BitmapWriter(object):
+    """validity bitmap written by batches of any size"""
+    def __init__(self, path):
+        self._path = path
+        self._fio = None
+        self._rows = 0
+        self._rest = numpy.zeros(0, dtype=bool)
+        self.has_null = False
+
+    def write(self, valid):
+        if not self.has_null and not valid.all():
+            self.has_null = True
+        bits = numpy.concatenate([self._rest, valid])
+        whole = len(bits) // 8 * 8
+        self._rest = bits[whole:]
+        self._rows += len(valid)
+        if self._fio is None:
+            self._fio = io.open(self._path + '.tmp', 'wb')
+        self._fio.write(numpy.packbits(bits[:whole], bitorder='little').tobytes())
+
+    def close(self):
+        """write the bitmap as .npy if the column has nulls
+
+        :return: True if written
+        """
+        if self._fio is None:
+            return False
+        self._fio.write(numpy.packbits(self._rest, bitorder='little').tobytes())
+        self._fio.close()
+        if not self.has_null:
+            os.remove(self._path + '.tmp')
+            return False
+        size = (self._rows + 7) // 8
+        with io.open(self._path, 'wb') as output:
+            _write_npy_header(output, numpy.dtype('uint8'), size)
+            with io.open(self._path + '.tmp', 'rb') as bits:
+                _copy(bits, output)
+        os.remove(self._path + '.tmp')
+        return True
+
+
+def _copy(source, target, size=1 << 20):
+    while True:
+        chunk = source.read(size)
+        if not chunk:
+            break
+        target.write(chunk)
+
+
+def _write_npy_header(fio, dtype, rows):
+    npy_format.write_array_header_1_0(fio, {'descr': npy_format.dtype_to_descr(dtype),
+                                             'fortran_order': False,
+                                             'shape': (rows,)})
+
+
+class _ColumnWriter(object):
+    def __init__(self, directory, number, name, python_type, rows):
+        self.name = name
+        self._directory = directory
+        self._base = '{:04d}'.format(number)
+        self._python_type = python_type
+        self._rows = rows
+        self._dtype = None
+        self._string = None
+        self._fio = None
+        self._offsets = None
+        self._offset = 0
+        self._validity = _BitmapWriter(self._path('.valid.npy'))
+
+    def _path(self, suffix):
+        return os.path.join(self._directory, self._base + suffix)
+
+    def _open(self, values):
+        dtype = _infer_dtype(values, self._python_type)
+        self._string = dtype is None
+        if self._string:
+            self._offsets = io.open(self._path('.offsets.npy'), 'wb')
+            _write_npy_header(self._offsets, numpy.dtype('int64'), self._rows + 1)
+            self._offsets.write(numpy.zeros(1, dtype=numpy.int64).tobytes())
+            self._fio = io.open(self._path('.data'), 'wb')
+        else:
+            self._dtype = dtype
+            self._fio = io.open(self._path('.npy'), 'wb')
+            _write_npy_header(self._fio, dtype, self._rows)
+
+    def write(self, values):
+        if self._fio is None:
+            self._open(values)
+        if hasattr(values, 'dtype') and values.dtype != object:
+            valid = numpy.ones(len(values), dtype=bool)
+        else:
+            valid = numpy.array([val is not None for val in values], dtype=bool)
+        self._validity.write(valid)
+        if self._string:
+            self._write_strings(values)
+        else:
+            self._write_fixed(values, valid)
+
+    def _write_fixed(self, values, valid):
+        if not hasattr(values, 'dtype') or values.dtype == object:
+            if hasattr(values, 'tolist'):
+                values = values.tolist()
+            if not valid.all():
+                # nulls are stored as zero
+                fill = numpy.zeros(1, dtype=self._dtype).tolist()[0]
+                values = [fill if val is None else val for val in values]
+            values = numpy.array(values, dtype=self._dtype)
+        self._fio.write(values.astype(self._dtype, copy=False).tobytes())
+
+    def _write_strings(self, values):
+        if hasattr(values, 'tolist'):
+            values = values.tolist()
+        encoded = [(val if isinstance(val, str) else format_value(val)).encode('utf-8')
+                   if val is not None else b'' for val in values]
+        lengths = numpy.fromiter((len(val) for val in encoded), dtype=numpy.int64,
+                                 count=len(encoded))
+        offsets = numpy.cumsum(lengths) + self._offset
+        if len(offsets):
+            self._offset = int(offsets[-1])
+        self._offsets.write(offsets.tobytes())
+        self._fio.write(b''.join(encoded))
+
+    def close(self):
+        if self._fio is None:
+            # no rows
+            self._open([])
+        self._fio.close()
+        entry = {'name': self.name}
+        if self._string:
+            self._offsets.close()
+            entry.update(kind='string', offsets=self._base + '.offsets.npy',
+                         data=self._base + '.data')
+        else:
+            entry.update(kind='fixed', dtype=npy_format.dtype_to_descr(self._dtype),
+                         file=self._base + '.npy')
+        has_null = self._validity.close()
+        entry['validity'] = self._base + '.valid.npy' if has_null else None
+        return entry
+
+
+def write_columnar(directory, name, columns, batches, rows):
+    """write ``batches`` (OrderedDict of column name to values) of a table
+
+    :param columns: Column objects of the table
+    :param rows: total number of rows in ``batches``
+    """
+    if numpy is None:
+        raise ImportError('columnar format requires numpy')
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    writers = [_ColumnWriter(directory, number, col.name,
+                             getattr(col, 'python_type', None), rows)
+               for number, col in enumerate(columns)]
+    written = 0
+    for batch in batches:
+        for writer, values in zip(writers, batch.values()):
+            writer.write(values)
+        written += len(next(iter(batch.values()))) if batch else 0
+    if written != rows:
+        raise ValueError('{} rows are written, {} rows are expected'.format(written, rows))
+    manifest = {'version': FORMAT_VERSION, 'table': name, 'rows': rows,
+                'columns': [writer.close() for writer in writers]}
+    with io.open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as fio:
+        fio.write(json.dumps(manifest, indent=2, ensure_ascii=False))
+
+
+class StringColumn(object):
+    """strings of a column, decoded when accessed"""
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:stop].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def tolist(self):
+        data = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        return [data[start:stop].decode('utf-8')
+                for start, stop in zip(offsets, offsets[1:])]
+
+
+def _load(directory, filename):
+    return numpy.load(os.path.join(directory, filename), mmap_mode='r')
+
+
+class ColumnarTable(object):
+    """table written by ``write_columnar``. columns are memory-mapped"""
+    def __init__(self, directory):
+        if numpy is None:
+            raise ImportError('columnar format requires numpy')
+        self.directory = directory
+        with io.open(os.path.join(directory, MANIFEST), encoding='utf-8') as fio:
+            self.manifest = json.load(fio)
+        self.name = self.manifest['table']
+        self.rows = self.manifest['rows']
+        self._entries = dict((entry['name'], entry)
+                             for entry in self.manifest['columns'])
+
+    def keys(self):
+        return [entry['name'] for entry in self.manifest['columns']]
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        """values of the column: numpy array, or StringColumn for strings
+
+        values of nulls are undefined. see ``valid``.
+        """
+        entry = self._entries[name]
+        if entry['kind'] == 'fixed':
+            return _load(self.directory, entry['file'])
+        offsets = _load(self.directory, entry['offsets'])
+        path = os.path.join(self.directory, entry['data'])
+        if os.path.getsize(path):
+            data = numpy.memmap(path, dtype=numpy.uint8, mode='r')
+        else:
+            data = numpy.zeros(0, dtype=numpy.uint8)
+        return StringColumn(offsets, data)
+
+    def valid(self, name):
+        """bool array, False for nulls. None if the column has no nulls"""
+        filename = self._entries[name]['validity']
+        if filename is None:
+            return None
+        bits = _load(self.directory, filename)
+        return numpy.unpackbits(bits, count=self.rows, bitorder='little').astype(bool)
+
+    def column(self, name):
+        """values of the column as list, with None for nulls"""
+        values = self[name].tolist()
+        valid = self.valid(name)
+        if valid is not None:
+            values = [val if ok else None for val, ok in zip(values, valid.tolist())]
+        return values
+
+
+def read_columnar(directory):
+    return ColumnarTable(directory)
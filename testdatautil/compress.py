@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import bz2
+import gzip
+import io
+import lzma
+import os
+import threading
+
+EXTENSIONS = {
+    'gzip': '.gz',
+    'bz2': '.bz2',
+    'xz': '.xz',
+}
+
+
+class ParallelGzipWriter(io.RawIOBase):
+    """gzip writer compressing blocks on a thread pool
+
+    each block is written as a gzip member. concatenated members are
+    a valid gzip file, readable by ``gzip -d``.
+    """
+    def __init__(self, path, block_size=1 << 20, workers=None, level=6):
+        super(ParallelGzipWriter, self).__init__()
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self._fileobj = open(path, 'wb')
+        self._block_size = block_size
+        self._level = level
+        self._buffer = []
+        self._buffered = 0
+        self._max_pending = workers * 2
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer.append(bytes(data))
+        self._buffered += len(data)
+        if self._buffered >= self._block_size:
+            self._submit()
+        return len(data)
+
+    def _submit(self):
+        block = b''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        # zlib releases GIL, so blocks are compressed in parallel
+        self._pending.append(self._executor.submit(gzip.compress, block,
+                                                   self._level, mtime=0))
+        while len(self._pending) > self._max_pending:
+            self._fileobj.write(self._pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffered or not self._pending:
+                self._submit()
+            while self._pending:
+                self._fileobj.write(self._pending.popleft().result())
+        finally:
+            self._executor.shutdown()
+            self._fileobj.close()
+            super(ParallelGzipWriter, self).close()
+
+
+class BackgroundWriter(object):
+    """write to ``fileobj`` in a background thread
+
+    ``write`` queues data and returns, so generation continues while
+    the file is written. it blocks while more than ``max_pending``
+    characters are queued or being written.
+    an error of the writer thread stops it, and is raised by every later
+    ``write``, ``flush`` and ``close``.
+    """
+    def __init__(self, fileobj, max_pending=1 << 24):
+        self._fileobj = fileobj
+        self._max_pending = max_pending
+        self._pending = 0
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._error = None
+        self._closing = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def write(self, data):
+        with self._condition:
+            while (self._pending and self._error is None and
+                   self._pending + len(data) > self._max_pending):
+                self._condition.wait()
+            self._raise_error()
+            if self._closing:
+                # nothing would write the data
+                raise ValueError('write to closed file')
+            self._queue.append(data)
+            self._pending += len(data)
+            self._condition.notify_all()
+        return len(data)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closing:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                data = self._queue.popleft()
+            try:
+                self._fileobj.write(data)
+            except BaseException as error:
+                with self._condition:
+                    self._error = error
+                    self._queue.clear()
+                    self._pending = 0
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._pending -= len(data)
+                self._condition.notify_all()
+
+    def flush(self):
+        with self._condition:
+            while self._pending and self._error is None:
+                self._condition.wait()
+            self._raise_error()
+        self._fileobj.flush()
+
+    def close(self):
+        if self._closing:
+            return
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join()
+        try:
+            self._raise_error()
+        finally:
+            self._fileobj.close()
+
+
+def compression_from_path(path):
+    for compress, ext in EXTENSIONS.items():
+        if path.endswith(ext):
+            return compress
+
+
+def open_output(path, compress=None, buffering=1 << 20,
+                encoding='utf-8', newline=None, append=False):
+    """open text output file
+
+    :param compress: 'gzip', 'bz2', 'xz' or None.
+        if None, compression is chosen by the file extension.
+    :param append: write at the end of the file. not supported if compressed
+    """
+    if compress is None:
+        compress = compression_from_path(path)
+    if compress is None:
+        return io.open(path, 'a' if append else 'w', buffering=buffering,
+                       encoding=encoding, newline=newline)
+    if append:
+        raise ValueError('compressed output can not be appended: {}'.format(path))
+    if compress == 'gzip':
+        raw = ParallelGzipWriter(path)
+    elif compress == 'bz2':
+        raw = bz2.BZ2File(path, 'wb')
+    elif compress == 'xz':
+        raw = lzma.LZMAFile(path, 'wb')
+    else:
+        raise ValueError('unknown compression: {}'.format(compress))
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffering),
+                            encoding=encoding, newline=newline)
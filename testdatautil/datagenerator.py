@@ -1,54 +1,115 @@
 # -*- coding: utf-8 -*-
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
-from datetime import datetime, date
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import csv
-import json
+import io
 import os
+import random
+import shutil
+from . import profiling
+from .checkpoint import FILENAME as CHECKPOINT_FILENAME, Checkpoint
+from .columnar import write_columnar
+from .compress import EXTENSIONS, BackgroundWriter, open_output
+from .factory import to_list
+from .fixture import EXT as FIXTURE_EXT, write_chunk, write_header
+from .keypool import RangeKeyPool
+from .rng import derive_seed
+from .serializer import (SQL_DIALECTS, compile_json_encoders,
+                         compile_json_template, compile_serializers,
+                         compile_sql_encoders, format_value)
 
 
 def formatdict(dictdata):
     result = dict()
     for key, val in dictdata.items():
-        if isinstance(val, datetime):
-            nval = datetime.strftime(val, "%Y-%m-%d %H:%M:%S")
-        elif isinstance(val, date):
-            nval = date.strftime(val, "%Y-%m-%d")
-        elif val is None:
-            nval = ''
-        elif isinstance(val, bool):
-            nval = "1" if val else "0"
-        else:
-            nval = str(val)
-        result[key] = nval
+        result[key] = format_value(val)
     return result
 
 
 class Formatter(object):
     ext = '.txt'
+    # tables can be written by separate processes
+    parallel = True
+    # rows can be appended to a file written before. see ``DataGenerator`` checkpoint
+    appendable = True
+    # rows generated at once
+    batch_size = 10000
+    buffer_size = 1 << 20
+    newline = None
+    # if set, files are written by a background thread, with at most
+    # this number of characters in flight
+    io_queue_size = None
 
-    def __init__(self, directory, length):
+    def __init__(self, directory, length, compress=None):
         self._directory = directory
         self._length = length
+        self._compress = compress
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        return self
+        return False
 
-    def write(self, table_name, dataschema):
-        filename = "{}{}".format(table_name, self.ext)
-        path = os.path.join(self._directory, filename)
-        with open(path, 'w') as fio:
-            self.write_file(dataschema, file_handle=fio)
+    def path(self, table_name):
+        ext = self.ext
+        if self._compress:
+            ext += EXTENSIONS[self._compress]
+        filename = "{}{}".format(table_name, ext)
+        return os.path.join(self._directory, filename)
+
+    def write(self, table_name, dataschema, start=0, stop=None, path=None):
+        """write rows from ``start`` to ``stop`` of the table
+
+        :param path: output file. default is ``self.path(table_name)``
+        """
+        if path is None:
+            path = self.path(table_name)
+        with self.open(path) as fio:
+            profiling.call_batch(self._profile_key(table_name), self._rows(start, stop),
+                                 self.write_file, dataschema, file_handle=fio,
+                                 start=start, stop=stop)
+
+    def _profile_key(self, table_name):
+        return ('write', table_name, type(self).__name__)
 
-    def write_file(self, dataschema, file_handle):
+    def _rows(self, start, stop):
+        if stop is None:
+            stop = self._length
+        return stop - start
+
+    def open(self, path, append=False):
+        """open output file. compressed if ``compress`` or the extension says so
+
+        :param append: write at the end of the file
+        """
+        fio = open_output(path, compress=self._compress,
+                          buffering=self.buffer_size, newline=self.newline,
+                          append=append)
+        if self.io_queue_size:
+            return BackgroundWriter(fio, self.io_queue_size)
+        return fio
+
+    def rows(self, dataschema, start=0, stop=None):
+        if stop is None:
+            stop = self._length
+        return dataschema.generate_range(start, stop)
+
+    def batches(self, dataschema, start=0, stop=None):
+        """iterate rows by batch. see ``Table.generate_batch``"""
+        return self.rows(dataschema, start, stop).batches(self.batch_size)
+
+    def write_file(self, dataschema, file_handle, start=0, stop=None):
         raise NotImplemented()
 
 
 class PythonFormatter(Formatter):
     ext = '.py'
+    # all tables are written to one file
+    parallel = False
+    appendable = False
 
     def __init__(self, directory, length):
         self._directory = directory
@@ -65,78 +126,677 @@ class PythonFormatter(Formatter):
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self._file_handle.close()
-        return self
+        return False
 
-    def write(self, table_name, dataschema):
-        self.write_file(dataschema, file_handle=self._file_handle)
-
-    def write_file(self, dataschema, file_handle):
-        table_name = dataschema.name
+    def write(self, table_name, dataschema, start=0, stop=None, path=None):
         self._tables.append(table_name)
-        file_handle.write('{} = [\n'.format(table_name))
-        for data in dataschema.generate(self._length):
-            file_handle.write('    {},\n'.format(repr(dict(data))))
+        self._file_handle.write('{} = [\n'.format(table_name))
+        profiling.call_batch(self._profile_key(table_name), self._rows(start, stop),
+                             self.write_file, dataschema,
+                             file_handle=self._file_handle, start=start, stop=stop)
+        self._file_handle.write(']\n')
 
-        file_handle.write(']\n')
+    def write_file(self, dataschema, file_handle, start=0, stop=None):
+        if start >= (self._length if stop is None else stop):
+            # factories of testdata can not iterate 0 rows
+            return
+        for data in self.rows(dataschema, start, stop):
+            file_handle.write('    {},\n'.format(repr(dict(data))))
 
 
 class JsonFormatter(Formatter):
     ext = '.json'
 
-    def write_file(self, dataschema, file_handle):
-        for data in dataschema.generate(self._length):
-            formatted = formatdict(data)
-            jsondata = json.dumps(formatted)
-            file_handle.write(jsondata + "\n")
+    def write_file(self, dataschema, file_handle, start=0, stop=None):
+        """write JSON Lines
+
+        numbers and booleans are written without quotes, None as null.
+        """
+        template = compile_json_template(dataschema.keys())
+        encoders = compile_json_encoders(dataschema)
+        for batch in self.batches(dataschema, start, stop):
+            columns = [encode(to_list(values))
+                       for encode, values in zip(encoders, batch.values())]
+            file_handle.write('\n'.join(map(template.format, *columns)))
+            file_handle.write('\n')
 
 
 class CsvFormatter(Formatter):
     ext = '.csv'
+    newline = ''
 
-    def __init__(self, directory, length, sep=b",",
-                 write_header=True):
+    def __init__(self, directory, length, sep=",",
+                 write_header=True, compress=None):
         self._directory = directory
         self._length = length
+        self._compress = compress
         self._sep = sep
         self._write_header = write_header
 
-    def write_file(self, dataschema, file_handle):
+    def write_file(self, dataschema, file_handle, start=0, stop=None):
         writer = csv.writer(file_handle,
                             delimiter=self._sep)
         keys = dataschema.keys()
-        if self._write_header:
+        if self._write_header and start == 0:
             writer.writerow([key for key in keys])
-        for data in dataschema.generate(self._length):
-            formatted = formatdict(data)
-            writer.writerow([formatted[key] for key in keys])
+        serializers = compile_serializers(dataschema)
+        for batch in self.batches(dataschema, start, stop):
+            columns = [serialize(to_list(values))
+                       for serialize, values in zip(serializers, batch.values())]
+            buf = io.StringIO()
+            csv.writer(buf, delimiter=self._sep).writerows(zip(*columns))
+            file_handle.write(buf.getvalue())
+
+
+class SqlFormatter(Formatter):
+    """write multi-row INSERT statements
+
+    :param dialect: 'sqlite', 'mysql' or 'postgresql'. quoting of names and literals
+    :param rows_per_statement: number of rows of an INSERT statement
+    :param statements_per_transaction: number of statements committed at once
+    """
+    ext = '.sql'
+
+    def __init__(self, directory, length, dialect='sqlite', rows_per_statement=1000,
+                 statements_per_transaction=100, compress=None):
+        self._directory = directory
+        self._length = length
+        self._compress = compress
+        self._dialect = SQL_DIALECTS[dialect]
+        self._rows_per_statement = rows_per_statement
+        self._statements_per_transaction = statements_per_transaction
+
+    def _statements(self, dataschema, start, stop):
+        """VALUES lists of statements"""
+        n_columns = len(dataschema.keys())
+        template = '(' + ', '.join(['{}'] * n_columns) + ')'
+        encoders = compile_sql_encoders(dataschema, self._dialect)
+        pending = []
+        for batch in self.batches(dataschema, start, stop):
+            columns = [encode(to_list(values))
+                       for encode, values in zip(encoders, batch.values())]
+            pending.extend(map(template.format, *columns))
+            while len(pending) >= self._rows_per_statement:
+                yield pending[:self._rows_per_statement]
+                del pending[:self._rows_per_statement]
+        if pending:
+            yield pending
+
+    def write_file(self, dataschema, file_handle, start=0, stop=None):
+        dialect = self._dialect
+        names = ', '.join(dialect.quote_identifier(key) for key in dataschema.keys())
+        insert = 'INSERT INTO {} ({}) VALUES\n'.format(
+            dialect.quote_identifier(dataschema.name), names)
+        count = 0
+        for rows in self._statements(dataschema, start, stop):
+            if count % self._statements_per_transaction == 0:
+                file_handle.write(dialect.begin + '\n')
+            file_handle.write(insert)
+            file_handle.write(',\n'.join(rows))
+            file_handle.write(';\n')
+            count += 1
+            if count % self._statements_per_transaction == 0:
+                file_handle.write('COMMIT;\n')
+        if count % self._statements_per_transaction:
+            file_handle.write('COMMIT;\n')
+
+
+class DatabaseFormatter(Formatter):
+    """insert rows into a database with SQLAlchemy
+
+    rows are inserted by executemany of ``batch_size`` rows,
+    and committed per batch.
+
+    :param engine: SQLAlchemy engine of the target database
+    :param tables: SQLAlchemy Table objects. reflected from the engine if None
+    :param drop_indexes: drop indexes of the table while loading, and recreate them
+    :param fast_load: use loader friendly settings of the database while loading.
+        previous settings of the connection are restored after loading a table
+    """
+    parallel = False
+    appendable = False
+    # dialect: (query of a setting, statement setting it, [(setting, value), ...])
+    _FAST_LOAD_SETTINGS = {
+        'sqlite': ('PRAGMA {name}', 'PRAGMA {name} = {value}',
+                   [('synchronous', 'OFF'), ('journal_mode', 'MEMORY')]),
+        'mysql': ('SELECT @@{name}', 'SET {name} = {value}',
+                  [('unique_checks', '0'), ('foreign_key_checks', '0')]),
+    }
+
+    def __init__(self, engine, length, tables=None, batch_size=10000,
+                 drop_indexes=False, fast_load=False):
+        self._directory = None
+        self._length = length
+        self._compress = None
+        self._engine = engine
+        self._tables = None
+        if tables is not None:
+            self._tables = dict((table.name, table) for table in tables)
+        self.batch_size = batch_size
+        self._drop_indexes = drop_indexes
+        self._fast_load = fast_load
+
+    def _find_table(self, table_name):
+        if self._tables is None:
+            from sqlalchemy import MetaData
+            meta = MetaData()
+            meta.reflect(bind=self._engine)
+            self._tables = dict(meta.tables)
+        return self._tables[table_name]
+
+    def path(self, table_name):
+        return None
+
+    def write(self, table_name, dataschema, start=0, stop=None, path=None):
+        table = self._find_table(table_name)
+        with self._engine.connect() as connection, self._load_settings(connection):
+            indexes = list(table.indexes) if self._drop_indexes else []
+            for index in indexes:
+                index.drop(connection)
+            self._commit(connection)
+            try:
+                profiling.call_batch(self._profile_key(table_name), self._rows(start, stop),
+                                     self.write_file, dataschema, connection,
+                                     start=start, stop=stop, table=table)
+            finally:
+                # indexes are recreated even if loading fails
+                if connection.in_transaction():
+                    connection.rollback()
+                for index in indexes:
+                    index.create(connection)
+                self._commit(connection)
+
+    @contextmanager
+    def _load_settings(self, connection):
+        """fast load settings of the connection, restored on exit
+
+        connections are pooled, so settings must not leak to later users.
+        """
+        from sqlalchemy import text
+        settings = self._FAST_LOAD_SETTINGS.get(self._engine.dialect.name)
+        if not self._fast_load or settings is None:
+            yield
+            return
+        query, statement, values = settings
+        previous = []
+        try:
+            for name, value in values:
+                previous.append((name, connection.execute(
+                    text(query.format(name=name))).scalar()))
+                connection.execute(text(statement.format(name=name, value=value)))
+            yield
+        finally:
+            if connection.in_transaction():
+                connection.rollback()
+            for name, value in reversed(previous):
+                connection.execute(text(statement.format(name=name, value=value)))
+            self._commit(connection)
+
+    def _commit(self, connection):
+        if connection.in_transaction():
+            connection.commit()
+
+    def write_file(self, dataschema, file_handle, start=0, stop=None, table=None):
+        if table is None:
+            table = self._find_table(dataschema.name)
+        connection = file_handle
+        statement = table.insert()
+        for batch in self.batches(dataschema, start, stop):
+            keys = list(batch.keys())
+            columns = [to_list(values) for values in batch.values()]
+            rows = [dict(zip(keys, row)) for row in zip(*columns)]
+            connection.execute(statement, rows)
+            connection.commit()
+
+
+class ColumnarFormatter(Formatter):
+    """write each table to a directory of typed binary column files
+
+    see ``columnar`` for the layout. ``columnar.read_columnar`` reads
+    the tables with memory-mapping.
+    """
+    ext = ''
+    # shards can not be concatenated
+    parallel = False
+    appendable = False
+
+    def __init__(self, directory, length):
+        self._directory = directory
+        self._length = length
+        self._compress = None
+
+    def write(self, table_name, dataschema, start=0, stop=None, path=None):
+        if path is None:
+            path = self.path(table_name)
+        profiling.call_batch(self._profile_key(table_name), self._rows(start, stop),
+                             self.write_file, dataschema, path,
+                             start=start, stop=stop)
+
+    def write_file(self, dataschema, file_handle, start=0, stop=None):
+        """
+        :param file_handle: directory of the table
+        """
+        write_columnar(file_handle, dataschema.name, dataschema.columns,
+                       self.batches(dataschema, start, stop),
+                       self._rows(start, stop))
+
+
+class FixtureFormatter(Formatter):
+    """write rows as chunks of pickled tuples, see ``fixture``
+
+    ``fixture.load_fixtures`` reads the tables lazily and streams rows.
+    """
+    ext = FIXTURE_EXT
+
+    def __init__(self, directory, length):
+        self._directory = directory
+        self._length = length
+        self._compress = None
+
+    def open(self, path, append=False):
+        fio = io.open(path, 'ab' if append else 'wb', buffering=self.buffer_size)
+        if self.io_queue_size:
+            return BackgroundWriter(fio, self.io_queue_size)
+        return fio
+
+    def write_file(self, dataschema, file_handle, start=0, stop=None):
+        if start == 0:
+            write_header(file_handle, dataschema.name, dataschema.keys())
+        for batch in self.batches(dataschema, start, stop):
+            write_chunk(file_handle, list(zip(*[to_list(values)
+                                                for values in batch.values()])))
+
+
+_worker_metadata = None
+
+
+def _init_worker(metadata, profile_interval=None):
+    global _worker_metadata
+    _worker_metadata = metadata
+    if profile_interval is not None:
+        profiling.enable(profile_interval)
+    else:
+        profiling.disable()
+
+
+def _seed_table(schema, seed, shard_size, random_access, origin=0):
+    if random_access:
+        schema.set_row_seed(seed)
+    else:
+        schema.set_seed(seed, shard_size, origin)
+
+
+def parse_table_length(value):
+    """number of rows, or (parent table, ratio) from 'parent*ratio'"""
+    if isinstance(value, (int, tuple)):
+        return value
+    value = '{}'.format(value).strip()
+    if '*' in value:
+        parent, ratio = value.rsplit('*', 1)
+        return (parent.strip(), float(ratio))
+    return int(value)
+
+
+def _write_table(formatter, table_name, seed, shard_size, random_access,
+                 start=0, stop=None, path=None):
+    schema = _worker_metadata.tables[table_name]
+    _seed_table(schema, seed, shard_size, random_access)
+    formatter.write(table_name, schema, start=start, stop=stop, path=path)
+    if profiling.active is not None:
+        return profiling.active.pop_stats()
+
+
+def _part_path(path, number):
+    return '{}.part{:05d}'.format(path, number)
+
+
+def _concat_parts(path, part_paths):
+    with open(path, 'wb') as output:
+        for part_path in part_paths:
+            with open(part_path, 'rb') as part:
+                shutil.copyfileobj(part, output)
+            os.remove(part_path)
+
+
+# rows between checkpoints, if shard_size is not given
+CHECKPOINT_INTERVAL = 100000
 
 
 class DataGenerator(object):
+    """write test data of tables
+
+    :param workers: number of processes. tables are written in parallel if > 1
+    :param seed: base seed. each table is generated with a seed derived
+        from this and the table name, so output does not depend on workers.
+    :param shard_size: split tables into shards of this number of rows.
+        shards are written by separate workers and concatenated in order.
+        random sources are reseeded at every shard, so output does not depend
+        on workers either.
+    :param random_access: draw values from counter based streams keyed by
+        (seed, table, column, row), see ``Table.set_row_seed``. columns of
+        factories without counter based streams are slower, see ``Column.seed_rows``
+    :param compress: compress csv/json/sql output. 'gzip', 'bz2' or 'xz'
+    :param db_url: SQLAlchemy url of the database for format='database'
+    :param dialect: SQL dialect for format='sql', see ``SqlFormatter``
+    :param rows_per_statement: rows of an INSERT statement for format='sql'
+    :param statements_per_transaction: statements of a transaction for format='sql'
+    :param io_queue_size: write files in a background thread while the next rows
+        are generated. at most this number of characters are in flight
+    :param table_lengths: number of rows by table name, instead of ``length``.
+        a number, or 'parent*ratio' for a ratio to the number of rows
+        of the parent table. see ``parse_table_length``
+    :param checkpoint: record progress to this file (True for a file in ``directory``)
+        every ``shard_size`` rows, CHECKPOINT_INTERVAL by default.
+        rows are the same as a run with the same ``shard_size``.
+        tables are written by one process, to uncompressed csv/json/sql/fixture files
+    :param resume: continue the run of the checkpoint. seed and shard_size
+        are taken from the checkpoint
+    :param append: add ``length`` (or ``table_lengths``) rows to the files of
+        the completed run of the checkpoint. counters continue from the
+        existing rows
+    """
     def __init__(self, metadata, directory,
                  table_names, sep=',',
                  write_header=True,
                  format='csv',
-                 length=10, formatter=None):
+                 length=None, formatter=None,
+                 workers=1, seed=None, shard_size=None,
+                 random_access=False, compress=None, db_url=None,
+                 dialect='sqlite', rows_per_statement=1000,
+                 statements_per_transaction=100, io_queue_size=None,
+                 table_lengths=None, checkpoint=None, resume=False, append=False):
         if not table_names:
             table_names = list(metadata.tables.keys())
+        if resume and append:
+            raise ValueError('resume and append can not be used together')
+        if (resume or append) and checkpoint is None:
+            checkpoint = True
+        if checkpoint is True:
+            checkpoint = os.path.join(directory, CHECKPOINT_FILENAME)
+        if seed is None and not (resume or append):
+            # taken from the checkpoint if resumed
+            seed = random.getrandbits(32)
+        if checkpoint is not None and shard_size is None and not (resume or append):
+            shard_size = CHECKPOINT_INTERVAL
+        if length is None:
+            # rows of the given formatter, 10 by default
+            length = getattr(formatter, '_length', 10)
         self._metadata = metadata
         self._table_names = table_names
         self._length = length
+        self._table_lengths = dict((name, parse_table_length(value))
+                                   for name, value in (table_lengths or {}).items())
+        for name, value in self._table_lengths.items():
+            names = [name, value[0]] if isinstance(value, tuple) else [name]
+            for table_name in names:
+                if table_name not in metadata.tables:
+                    raise ValueError('unknown table in row counts: {}'.format(table_name))
+        self._workers = workers
+        self._seed = seed
+        self._shard_size = shard_size
+        self._random_access = random_access
+        self._checkpoint_path = checkpoint
+        self._resume = resume
+        self._append = append
         if formatter is None:
+            if compress and format not in ('csv', 'json', 'sql'):
+                raise ValueError('{} output can not be compressed'.format(format))
             if format == 'python':
                 formatter = PythonFormatter(directory, length)
             elif format == 'json':
-                formatter = JsonFormatter(directory, length)
+                formatter = JsonFormatter(directory, length, compress=compress)
+            elif format == 'sql':
+                formatter = SqlFormatter(directory, length, dialect=dialect,
+                                         rows_per_statement=rows_per_statement,
+                                         statements_per_transaction=statements_per_transaction,
+                                         compress=compress)
+            elif format == 'columnar':
+                formatter = ColumnarFormatter(directory, length)
+            elif format == 'fixture':
+                formatter = FixtureFormatter(directory, length)
+            elif format == 'database':
+                from sqlalchemy import create_engine
+                formatter = DatabaseFormatter(create_engine(db_url), length)
             else:
                 formatter = CsvFormatter(directory, length, sep=sep,
-                                         write_header=write_header)
+                                         write_header=write_header,
+                                         compress=compress)
 
+        if io_queue_size:
+            formatter.io_queue_size = io_queue_size
         self._formatter = formatter
+        if checkpoint is not None:
+            if workers > 1:
+                raise ValueError('checkpoint requires workers=1')
+            if not formatter.appendable or formatter._compress:
+                raise ValueError('checkpoint requires uncompressed csv, json, sql '
+                                 'or fixture output')
+
+    def table_seed(self, table_name):
+        return derive_seed(self._seed, table_name)
+
+    def table_length(self, table_name, _resolving=()):
+        """number of rows of the table"""
+        value = self._table_lengths.get(table_name, self._length)
+        if isinstance(value, tuple):
+            parent, ratio = value
+            if parent in _resolving:
+                raise ValueError('row counts of {} refer to each other'.format(
+                    ', '.join(_resolving + (parent,))))
+            parent_length = self.table_length(parent, _resolving + (table_name,))
+            value = int(round(parent_length * ratio))
+        return value
 
     def generate(self):
         items = self._metadata.tables
+        # parent tables first
+        table_names = [name for name in items if name in self._table_names]
+        if self._checkpoint_path is not None:
+            checkpoint = self._start_checkpoint(table_names)
+            self._prepare_key_pools(table_names, checkpoint)
+            with self._formatter as formatter:
+                for table_name in table_names:
+                    self._write_checkpointed(formatter, table_name, checkpoint)
+            return
+
+        recorded = self._prepare_key_pools(table_names)
         with self._formatter as formatter:
-            for table_name in self._table_names:
-                if table_name in items:
-                    schema = items[table_name]
-                    formatter.write(table_name, schema)
+            if self._workers > 1 and formatter.parallel:
+                # keys of recorded tables must be generated before forking workers
+                for table_name in recorded:
+                    self._write_table(formatter, table_name)
+                self._generate_parallel(formatter, [name for name in table_names
+                                                    if name not in recorded])
+                return
+
+            for table_name in table_names:
+                self._write_table(formatter, table_name)
+
+    def _write_table(self, formatter, table_name):
+        schema = self._metadata.tables[table_name]
+        _seed_table(schema, self.table_seed(table_name),
+                    self._shard_size, self._random_access)
+        formatter.write(table_name, schema, start=0, stop=self.table_length(table_name))
+
+    def _start_checkpoint(self, table_names):
+        """checkpoint of a new run, or the loaded one to resume or append
+
+        lengths of the tables are set to the rows of the completed run.
+        """
+        path = self._checkpoint_path
+        if not (self._resume or self._append):
+            checkpoint = Checkpoint(path, self._seed, self._shard_size, self._random_access)
+            for table_name in table_names:
+                checkpoint.table(table_name)['length'] = self.table_length(table_name)
+            checkpoint.save()
+            return checkpoint
+
+        checkpoint = Checkpoint.load(path)
+        if checkpoint is None:
+            raise ValueError('checkpoint is not found: {}'.format(path))
+        for name, value, saved in [('seed', self._seed, checkpoint.seed),
+                                   ('shard_size', self._shard_size, checkpoint.shard_size),
+                                   ('random_access', self._random_access,
+                                    checkpoint.random_access)]:
+            if value is not None and value != saved:
+                raise ValueError('{} {} differs from {} of the checkpoint'.format(
+                    name, value, saved))
+        self._seed = checkpoint.seed
+        self._shard_size = checkpoint.shard_size
+        self._random_access = checkpoint.random_access
+        if self._append:
+            incomplete = [name for name in sorted(checkpoint.tables)
+                          if not checkpoint.is_complete(name)]
+            if incomplete:
+                raise ValueError('run of the checkpoint is not complete, resume it first: '
+                                 '{}'.format(', '.join(incomplete)))
+            added = dict((name, self.table_length(name)) for name in table_names)
+            for table_name in table_names:
+                state = checkpoint.table(table_name)
+                state['origin'] = state['rows']
+                state['origins'].append(state['rows'])
+                state['length'] = state['rows'] + added[table_name]
+        for table_name, state in checkpoint.tables.items():
+            self._table_lengths[table_name] = state['length']
+        checkpoint.save()
+        return checkpoint
+
+    def _write_checkpointed(self, formatter, table_name, checkpoint):
+        """write shards of the table not written yet, and save the checkpoint after each"""
+        state = checkpoint.table(table_name)
+        if state['rows'] >= state['length']:
+            return
+        schema = self._metadata.tables[table_name]
+        _seed_table(schema, self.table_seed(table_name), self._shard_size,
+                    self._random_access, state['origin'])
+        path = formatter.path(table_name)
+        append = state['rows'] > 0
+        if append:
+            # drop rows written after the checkpoint
+            with open(path, 'r+b') as fio:
+                fio.truncate(state['offset'])
+        with formatter.open(path, append=append) as fio:
+            for start, stop in self.shards(state['length'], state['origin']):
+                if stop <= state['rows']:
+                    continue
+                profiling.call_batch(formatter._profile_key(table_name), stop - start,
+                                     formatter.write_file, schema, file_handle=fio,
+                                     start=start, stop=stop)
+                fio.flush()
+                checkpoint.update(table_name, stop, os.path.getsize(path))
+
+    def _prepare_key_pools(self, table_names, checkpoint=None):
+        """set up key pools of parent columns for foreign keys
+
+        ranges of counters are known from the length. other keys are recorded
+        while writing the parent table. rows which are not written by this run
+        (tables not in ``table_names``, rows written by previous runs of the
+        ``checkpoint``) are generated again, see ``_regenerate``.
+
+        :return: names of tables whose keys are recorded while writing
+        """
+        recorded = []
+        for table_name, schema in self._metadata.tables.items():
+            length = self.table_length(table_name)
+            has_pools = False
+            for col in schema.columns:
+                pool = col.key_pool
+                if pool is None:
+                    continue
+                if isinstance(pool, RangeKeyPool):
+                    pool.set_length(length)
+                    continue
+                pool.clear()
+                has_pools = True
+            if table_name not in table_names:
+                if has_pools:
+                    self._regenerate(table_name, [(0, length)])
+                continue
+            if checkpoint is not None:
+                runs = checkpoint.runs(table_name)
+                # values of unique columns are checked against previous rows
+                if runs and (has_pools or schema.enforces_unique()):
+                    self._regenerate(table_name, runs)
+            if has_pools:
+                recorded.append(table_name)
+        return recorded
+
+    def _regenerate(self, table_name, runs):
+        """generate rows of the table again without writing them
+
+        key pools and values checked for uniqueness are filled as if the rows
+        were written. runs are generated in blocks from their first row, as
+        written by ``_write_checkpointed``. values of foreign keys are the
+        same when parent tables have the same number of rows as in the run.
+
+        :param runs: [(first row, stop), ...] row ranges of runs
+        """
+        schema = self._metadata.tables[table_name]
+        seed = self.table_seed(table_name)
+        if self._random_access and not schema.enforces_unique():
+            # keys do not depend on other columns
+            _seed_table(schema, seed, self._shard_size, self._random_access)
+            length = runs[-1][1]
+            for col in schema.columns:
+                if col.key_pool is None or isinstance(col.key_pool, RangeKeyPool):
+                    continue
+                column = col.generate(length)
+                for start, stop in self.shards(length):
+                    column.generate_batch(stop - start)
+            return
+
+        for origin, stop in runs:
+            _seed_table(schema, seed, self._shard_size, self._random_access, origin)
+            for _ in self._formatter.batches(schema, origin, stop):
+                pass
+
+    def shards(self, length=None, origin=0):
+        """row ranges [(start, stop), ...] of a table of ``length`` rows
+
+        :param origin: first row
+        """
+        if length is None:
+            length = self._length
+        if not self._shard_size:
+            return [(origin, length)]
+        return [(start, min(start + self._shard_size, length))
+                for start in range(origin, length, self._shard_size)]
+
+    def _generate_parallel(self, formatter, table_names):
+        parts = []
+        profile_interval = None
+        if profiling.active is not None:
+            profile_interval = profiling.active.sample_interval
+        with ProcessPoolExecutor(max_workers=self._workers,
+                                 initializer=_init_worker,
+                                 initargs=(self._metadata, profile_interval)) as executor:
+            futures = []
+            for table_name in table_names:
+                seed = self.table_seed(table_name)
+                path = formatter.path(table_name)
+                shards = self.shards(self.table_length(table_name))
+                if len(shards) <= 1 or self._metadata.tables[table_name].enforces_unique():
+                    # unique values depend on all previous rows
+                    futures.append(executor.submit(_write_table, formatter, table_name,
+                                                   seed, self._shard_size,
+                                                   self._random_access,
+                                                   0, self.table_length(table_name)))
+                    continue
+
+                part_paths = []
+                for number, (start, stop) in enumerate(shards):
+                    part_path = _part_path(path, number)
+                    futures.append(executor.submit(_write_table, formatter, table_name,
+                                                   seed, self._shard_size,
+                                                   self._random_access,
+                                                   start, stop, part_path))
+                    part_paths.append(part_path)
+                parts.append((path, part_paths))
+
+            for future in futures:
+                stats = future.result()
+                if stats:
+                    profiling.active.merge(stats)
+
+        for path, part_paths in parts:
+            _concat_parts(path, part_paths)
@@ -2,15 +2,30 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from collections import OrderedDict
+from sqlalchemy.schema import PrimaryKeyConstraint, UniqueConstraint
 from .schema import MetaData
 
 
 class TableData(OrderedDict):
-    def __init__(self, name, dictlike):
+    """
+    :param unique_together: list of column name tuples whose combination is unique
+    """
+    def __init__(self, name, dictlike, unique_together=()):
         self.name = name
+        self.unique_together = list(unique_together)
         super(TableData, self).__init__(dictlike)
 
 
+def _unique_together(table):
+    result = []
+    for constraint in table.constraints:
+        if isinstance(constraint, (UniqueConstraint, PrimaryKeyConstraint)):
+            names = tuple(col.name for col in constraint.columns)
+            if len(names) > 1:
+                result.append(names)
+    return result
+
+
 def from_sqlalchemy_tables(tables, rule_set):
     metadata = MetaData()
     table_datas = []
@@ -19,7 +34,8 @@ def from_sqlalchemy_tables(tables, rule_set):
         for col in table.columns:
             table_dic[col.name] = col
 
-        table_data = TableData(table.name, table_dic)
+        table_data = TableData(table.name, table_dic,
+                               unique_together=_unique_together(table))
         table_datas.append(table_data)
 
     rule_set.apply_all(metadata=metadata, tables=table_datas)
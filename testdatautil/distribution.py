@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""distributions of column values of a source database
+
+``profile_database`` samples rows of each table and keeps a compact profile
+per column
+
+- null_rate: rate of nulls
+- top: most common values with their rates among non-null values
+- histogram: bin edges and counts of other numbers, dates and datetimes
+- lengths: lengths and counts of other strings
+- min, max: range of numbers, dates and datetimes
+
+``ColumnSampler`` draws values matching a profile from alias tables,
+see ``rule.ProfiledRuleSet``. profiles are plain dicts, saved as JSON.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import io
+import json
+import os
+from testdata import Factory
+from .factory import BatchMixin
+from .rng import derive_seed, uniform_array
+from .weighted import AliasTable
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+_EPOCH = datetime(1970, 1, 1)
+# uniform numbers drawn per value: null, top or rest, rest, offset in rest
+_PARTS = 4
+_LCG_MULTIPLIER = 6364136223846793005
+_LCG_INCREMENT = 1442695040888963407
+
+
+def column_kind(column):
+    """kind of values of a SQLAlchemy column, None if not profiled"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    if issubclass(python_type, bool):
+        return 'boolean'
+    if issubclass(python_type, datetime):
+        return 'datetime'
+    if issubclass(python_type, date):
+        return 'date'
+    if issubclass(python_type, (int, float, Decimal)):
+        return 'numeric'
+    if issubclass(python_type, str):
+        return 'string'
+    return None
+
+
+def _encode(value, kind):
+    """value as stored in JSON"""
+    if kind in ('date', 'datetime'):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _decode(value, kind):
+    if kind == 'datetime':
+        return datetime.fromisoformat(value)
+    if kind == 'date':
+        return date.fromisoformat(value)
+    return value
+
+
+def _to_number(value, kind):
+    if kind == 'datetime':
+        return (value.replace(tzinfo=None) - _EPOCH).total_seconds()
+    if kind == 'date':
+        return value.toordinal()
+    return float(value)
+
+
+def profile_values(values, kind, top_k=20, bins=20):
+    """profile of values of a column of ``kind``, see ``column_kind``"""
+    non_null = [value for value in values if value is not None]
+    profile = OrderedDict()
+    profile['kind'] = kind
+    profile['rows'] = len(values)
+    profile['null_rate'] = 1.0 - len(non_null) / len(values) if values else 0.0
+    counts = Counter(_encode(value, kind) for value in non_null)
+    top = counts.most_common(top_k)
+    profile['distinct'] = len(counts)
+    profile['top'] = [[value, count / len(non_null)] for value, count in top]
+    if kind in ('numeric', 'date', 'datetime') and non_null:
+        profile['integer'] = kind != 'numeric' or all(
+            isinstance(value, int) for value in non_null)
+        profile['min'] = _encode(min(non_null), kind)
+        profile['max'] = _encode(max(non_null), kind)
+    if len(counts) <= len(top):
+        return profile
+    top_values = set(value for value, count in top)
+    rest = [value for value in non_null if _encode(value, kind) not in top_values]
+    if kind == 'string':
+        lengths = Counter(len(value) for value in rest)
+        profile['lengths'] = sorted([length, count] for length, count in lengths.items())
+    elif kind in ('numeric', 'date', 'datetime'):
+        numbers = numpy.array([_to_number(value, kind) for value in rest])
+        hist, edges = numpy.histogram(numbers, bins=min(bins, len(counts) - len(top)))
+        profile['histogram'] = {'edges': edges.tolist(), 'counts': hist.tolist()}
+    return profile
+
+
+def _sample_query(table, sample_size, dialect):
+    from sqlalchemy import func, select
+    query = select(*table.columns)
+    if dialect == 'mysql':
+        query = query.order_by(func.rand())
+    else:
+        query = query.order_by(func.random())
+    return query.limit(sample_size)
+
+
+def profile_database(engine, tables=None, sample_size=10000, top_k=20, bins=20):
+    """profiles of columns of the database
+
+    ``sample_size`` random rows are read from each table.
+
+    :param tables: SQLAlchemy Table objects. reflected from the engine if None
+    :return: {table name: {column name: profile}}
+    """
+    if numpy is None:
+        raise ImportError('profiling requires numpy')
+    if tables is None:
+        from sqlalchemy import MetaData
+        meta = MetaData()
+        meta.reflect(bind=engine)
+        tables = meta.sorted_tables
+    profiles = OrderedDict()
+    with engine.connect() as connection:
+        for table in tables:
+            rows = connection.execute(
+                _sample_query(table, sample_size, engine.dialect.name)).fetchall()
+            columns = OrderedDict()
+            for position, column in enumerate(table.columns):
+                kind = column_kind(column)
+                if kind is None:
+                    continue
+                columns[column.name] = profile_values([row[position] for row in rows],
+                                                      kind, top_k=top_k, bins=bins)
+            profiles[table.name] = columns
+    return profiles
+
+
+def save_profiles(path, profiles):
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with io.open(temp_path, 'w', encoding='utf-8') as fio:
+        fio.write(json.dumps(profiles, indent=1, ensure_ascii=False))
+    os.replace(temp_path, path)
+
+
+def load_profiles(path):
+    with io.open(path, encoding='utf-8') as fio:
+        return json.load(fio, object_pairs_hook=OrderedDict)
+
+
+def _object_array(values):
+    array = numpy.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class ColumnSampler(object):
+    """draw values matching a profile of ``profile_values``
+
+    a sampler does not change once built, and is shared by copies of factories.
+    """
+    def __init__(self, profile):
+        if numpy is None:
+            raise ImportError('profiled columns require numpy')
+        self.kind = kind = profile['kind']
+        self._null_rate = profile['null_rate']
+        top = profile['top']
+        self._top = _object_array([_decode(value, kind) for value, rate in top])
+        rates = [rate for value, rate in top]
+        self._rest = None
+        self._bins = None
+        self._length_table = None
+        histogram = profile.get('histogram')
+        lengths = profile.get('lengths')
+        if histogram is not None and sum(histogram['counts']):
+            self._rest = 'numbers'
+            self._edges = numpy.array(histogram['edges'])
+            self._bins = AliasTable(histogram['counts'])
+            self._integer = profile.get('integer', False)
+            self._range = (_to_number(_decode(profile['min'], kind), kind),
+                           _to_number(_decode(profile['max'], kind), kind))
+        elif lengths:
+            self._rest = 'strings'
+            self._lengths = numpy.array([length for length, count in lengths])
+            self._length_table = AliasTable([count for length, count in lengths])
+        if self._rest is not None:
+            rates.append(max(1.0 - sum(rates), 0.0))
+        self._choice = AliasTable(rates) if rates else None
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def sample(self, uniforms):
+        """values drawn from ``uniforms`` (``_PARTS`` arrays of equal size)"""
+        u_null, u_choice, u_rest, u_offset = uniforms
+        size = len(u_null)
+        result = numpy.empty(size, dtype=object)
+        if self._choice is None:
+            return result
+        indexes = self._choice.sample_array(u_choice)
+        is_top = indexes < len(self._top)
+        result[is_top] = self._top[indexes[is_top]]
+        if self._rest is not None and not is_top.all():
+            rest = ~is_top
+            if self._rest == 'numbers':
+                values = self._numbers(u_rest[rest], u_offset[rest])
+            else:
+                values = self._strings(u_rest[rest], u_offset[rest])
+            result[rest] = _object_array(values)
+        result[u_null < self._null_rate] = None
+        return result
+
+    def _numbers(self, u_bin, u_offset):
+        bins = self._bins.sample_array(u_bin)
+        low, high = self._edges[bins], self._edges[bins + 1]
+        numbers = numpy.clip(low + u_offset * (high - low), *self._range)
+        if self._integer:
+            numbers = numpy.floor(numbers).astype(numpy.int64)
+        numbers = numbers.tolist()
+        if self.kind == 'date':
+            return [date.fromordinal(number) for number in numbers]
+        if self.kind == 'datetime':
+            return [_EPOCH + timedelta(seconds=number) for number in numbers]
+        return numbers
+
+    def _strings(self, u_length, u_letters):
+        """random lowercase letters of lengths drawn from the profile"""
+        lengths = self._lengths[self._length_table.sample_array(u_length)]
+        width = int(lengths.max()) if len(lengths) else 0
+        state = (u_letters * 2 ** 53).astype(numpy.uint64)
+        letters = numpy.empty((len(lengths), width), dtype=numpy.uint8)
+        with numpy.errstate(over='ignore'):
+            for position in range(width):
+                state = state * numpy.uint64(_LCG_MULTIPLIER) + numpy.uint64(_LCG_INCREMENT)
+                letters[:, position] = (state >> numpy.uint64(33)) % numpy.uint64(26) + 97
+        return [row[:length].tobytes().decode('ascii')
+                for row, length in zip(letters, lengths.tolist())]
+
+
+class ProfiledFactory(BatchMixin, Factory):
+    """draw values matching a column profile, see ``ColumnSampler``"""
+    def __init__(self, profile):
+        self._sampler = ColumnSampler(profile)
+        self._keys = None
+        super(ProfiledFactory, self).__init__()
+
+    def seed_rows(self, key):
+        super(ProfiledFactory, self).seed_rows(key)
+        self._keys = None
+        if key is not None:
+            self._keys = [derive_seed(key, part) for part in range(_PARTS)]
+
+    def _uniforms(self, size):
+        if self._key is None:
+            return numpy.random.random((_PARTS, size))
+        return [uniform_array(key, self.current_index, size) for key in self._keys]
+
+    def __call__(self):
+        return self._sampler.sample(self._uniforms(1))[0]
+
+    def _batch_numpy(self, size):
+        return self._sampler.sample(self._uniforms(size))
@@ -1,9 +1,98 @@
 # -*- coding: utf-8 -*-
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
+from datetime import datetime, timedelta
+import math
+import random
 
-from faker import Faker
-from testdata import Factory, CountingFactory
+from testdata import (Factory, CountingFactory, Constant,
+                      RandomInteger, RandomFloat, RandomSelection,
+                      RandomDateFactory, DateIntervalFactory)
+from testdata.errors import NoSuchDatatype
+from .rng import uniform, uniform_array
+from .weighted import AliasTable
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+_MICROSECONDS_PER_DAY = 86400 * 10 ** 6
+_faker = None
+
+
+def get_faker():
+    """Faker instance shared in the process
+
+    factories do not hold their own Faker, so copies of factories
+    keep using the random state seeded by ``Faker.seed``.
+    """
+    global _faker
+    if _faker is None:
+        from faker import Faker
+        _faker = Faker()
+    return _faker
+
+
+def to_list(values):
+    """convert batch values (list or numpy array) to list of python objects"""
+    if hasattr(values, 'tolist'):
+        return values.tolist()
+    return list(values)
+
+
+def _microseconds(delta):
+    return (delta.days * 86400 + delta.seconds) * 10 ** 6 + delta.microseconds
+
+
+def _datetime_unit(value):
+    if isinstance(value, datetime):
+        return 'us'
+    return 'D'
+
+
+class BatchMixin(object):
+    """factory which can generate many values at once
+
+    ``batch(size)`` returns values of the next ``size`` rows
+    and advances the index. with numpy, values are returned as numpy array.
+
+    after ``seed_rows(key)``, random values are drawn from the counter based
+    stream ``key``, so a value only depends on the key and the row index.
+    """
+    _key = None
+
+    def seed_rows(self, key):
+        self._key = key
+
+    def _uniform(self):
+        if self._key is None:
+            return random.random()
+        return uniform(self._key, self.current_index)
+
+    def _uniform_array(self, size):
+        if self._key is None:
+            return numpy.random.random(size)
+        return uniform_array(self._key, self.current_index, size)
+
+    def batch(self, size):
+        if numpy is None:
+            values = self._batch_python(size)
+        else:
+            values = self._batch_numpy(size)
+        self._current_index += size
+        return values
+
+    def _batch_python(self, size):
+        start = self._current_index
+        values = []
+        for index in range(start, start + size):
+            self._current_index = index
+            values.append(self())
+        self._current_index = start
+        return values
+
+    def _batch_numpy(self, size):
+        return self._batch_python(size)
 
 
 class DependentFactory(Factory):
@@ -32,18 +121,192 @@ class DependentFactory(Factory):
             base.increse_index()
 
 
-class WordFactory(Factory):
+class FakerMixin(object):
+    """factory calling a provider of the shared Faker
+
+    the provider is looked up once, and is not copied with the factory.
+    """
+    _provider = None
+
+    def faker_provider(self, name):
+        if self._provider is None:
+            self._provider = getattr(get_faker(), name)
+        return self._provider
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_provider', None)
+        return state
+
+
+class WordFactory(FakerMixin, Factory):
     def __init__(self, length=20):
-        self.fake = Faker()
         self.length = length
         super(WordFactory, self).__init__()
 
+    @property
+    def fake(self):
+        return get_faker()
+
     def __call__(self):
-        word = self.fake.word()
+        word = self.faker_provider('word')()
         return word[:self.length]
 
 
-class PrefixedCountingFactory(CountingFactory):
+class FakeDataFactory(FakerMixin, Factory):
+    """return value of Faker provider ``data_type``"""
+    def __init__(self, data_type):
+        if not hasattr(get_faker(), data_type):
+            raise NoSuchDatatype(data_type)
+        self._data_type = data_type
+        super(FakeDataFactory, self).__init__()
+
+    def __call__(self):
+        return self.faker_provider(self._data_type)()
+
+
+class BatchConstant(BatchMixin, Constant):
+    def _batch_python(self, size):
+        return [self._constant_value] * size
+
+
+class BatchRandomInteger(BatchMixin, RandomInteger):
+    def __call__(self):
+        if self._key is None:
+            return super(BatchRandomInteger, self).__call__()
+        width = self._maximum - self._minimum + 1
+        return self._minimum + int(self._uniform() * width)
+
+    def _batch_numpy(self, size):
+        if self._key is None:
+            return numpy.random.randint(self._minimum, self._maximum + 1,
+                                        size=size, dtype=numpy.int64)
+        width = self._maximum - self._minimum + 1
+        values = numpy.floor(self._uniform_array(size) * width).astype(numpy.int64)
+        return values + self._minimum
+
+
+class BatchRandomFloat(BatchMixin, RandomFloat):
+    def __call__(self):
+        return self._uniform() * (self._maximum - self._minimum) + self._minimum
+
+    def _batch_numpy(self, size):
+        width = self._maximum - self._minimum
+        return self._uniform_array(size) * width + self._minimum
+
+
+def choice_array(values):
+    """numpy array of ``values`` to index batches of choices
+
+    typed if all values are of the same scalar type, otherwise an object
+    array, so values are not converted (``['a', 1]`` would give ``'1'``).
+    """
+    types = set(type(value) for value in values)
+    if len(types) == 1 and types.pop() in (bool, int, float, str):
+        array = numpy.asarray(values)
+        if array.ndim == 1 and array.dtype != object:
+            return array
+    array = numpy.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class BatchRandomSelection(BatchMixin, RandomSelection):
+    def __call__(self):
+        if self._key is None:
+            return super(BatchRandomSelection, self).__call__()
+        return self._sequence[int(self._uniform() * len(self._sequence))]
+
+    def _batch_numpy(self, size):
+        choices = choice_array(self._sequence)
+        if self._key is None:
+            indexes = numpy.random.randint(0, len(choices), size=size)
+        else:
+            indexes = numpy.floor(self._uniform_array(size) * len(choices)).astype(numpy.int64)
+        return choices[indexes]
+
+
+class WeightedChoiceFactory(BatchMixin, Factory):
+    """draw one of ``choices`` with probability proportional to ``weights``
+
+    an ``AliasTable`` turns one uniform number into a choice,
+    whatever the number of choices.
+    """
+    def __init__(self, choices, weights):
+        if len(choices) != len(weights):
+            raise ValueError('{} choices and {} weights are given'.format(
+                len(choices), len(weights)))
+        self._choices = list(choices)
+        self._table = AliasTable(weights)
+        self._array = None
+        super(WeightedChoiceFactory, self).__init__()
+
+    def __call__(self):
+        return self._choices[self._table.sample(self._uniform())]
+
+    def _batch_numpy(self, size):
+        if self._array is None:
+            self._array = choice_array(self._choices)
+        return self._array[self._table.sample_array(self._uniform_array(size))]
+
+
+class BatchRandomDate(BatchMixin, RandomDateFactory):
+    def __call__(self):
+        # same arithmetic as _batch_numpy
+        offset = self._uniform() * self._delta_seconds * self._sign
+        if _datetime_unit(self._minimum) == 'D':
+            return self._minimum + timedelta(days=math.floor(offset / 86400))
+        return self._minimum + timedelta(microseconds=round(offset * 10 ** 6))
+
+    def _batch_numpy(self, size):
+        if getattr(self._minimum, 'tzinfo', None) is not None:
+            return self._batch_python(size)
+        unit = _datetime_unit(self._minimum)
+        minimum = numpy.datetime64(self._minimum, unit)
+        offsets = self._uniform_array(size) * self._delta_seconds * self._sign
+        if unit == 'D':
+            offsets = numpy.floor(offsets / 86400)
+        else:
+            offsets = numpy.rint(offsets * 10 ** 6)
+        return minimum + offsets.astype('timedelta64[{}]'.format(unit))
+
+
+class BatchCountingFactory(BatchMixin, CountingFactory):
+    def _counts(self, size):
+        start = self.current_index
+        if numpy is None:
+            return [self._start_value + self._step * i
+                    for i in range(start, start + size)]
+        indexes = numpy.arange(start, start + size, dtype=numpy.int64)
+        return indexes * self._step + self._start_value
+
+    def _batch_python(self, size):
+        return self._counts(size)
+
+    def _batch_numpy(self, size):
+        return self._counts(size)
+
+
+class BatchDateInterval(BatchMixin, DateIntervalFactory):
+    def _batch_numpy(self, size):
+        if getattr(self._base, 'tzinfo', None) is not None:
+            return self._batch_python(size)
+        unit = _datetime_unit(self._base)
+        start = self.current_index
+        offsets = (numpy.arange(start, start + size, dtype=numpy.int64) *
+                   _microseconds(self._delta))
+        if unit == 'D':
+            offsets //= _MICROSECONDS_PER_DAY
+        base = numpy.datetime64(self._base, unit)
+        return base + offsets.astype('timedelta64[{}]'.format(unit))
+
+    def _batch_python(self, size):
+        start = self.current_index
+        return [self._base + i * self._delta
+                for i in range(start, start + size)]
+
+
+class PrefixedCountingFactory(BatchCountingFactory):
     def __init__(self, prefix, start_value=0, step=1):
         super(PrefixedCountingFactory, self).__init__(start_value=start_value,
                                                       step=step)
@@ -52,3 +315,42 @@ class PrefixedCountingFactory(CountingFactory):
     def __call__(self):
         retval = super(PrefixedCountingFactory, self).__call__()
         return "{}{}".format(self.prefix, retval)
+
+    def _batch_python(self, size):
+        prefix = self.prefix
+        return ["{}{}".format(prefix, val) for val in to_list(self._counts(size))]
+
+    def _batch_numpy(self, size):
+        return self._batch_python(size)
+
+
+class PoolFactory(BatchMixin, Factory):
+    """draw values from ``pool`` (``pool.ValuePool``) by random index"""
+    def __init__(self, pool):
+        self._pool = pool
+        super(PoolFactory, self).__init__()
+
+    def _pool_size(self):
+        size = len(self._pool)
+        if not size:
+            raise ValueError('pool is empty')
+        return size
+
+    def __call__(self):
+        return self._pool[int(self._uniform() * self._pool_size())]
+
+    def _batch_numpy(self, size):
+        indexes = numpy.floor(self._uniform_array(size) * self._pool_size())
+        return self._pool.take(indexes.astype(numpy.int64))
+
+
+class ForeignKeyFactory(PoolFactory):
+    """draw keys generated for a parent column from ``key_pool``"""
+    def __init__(self, key_pool):
+        super(ForeignKeyFactory, self).__init__(key_pool)
+
+    def _pool_size(self):
+        size = len(self._pool)
+        if not size:
+            raise ValueError('no keys are generated for the parent column')
+        return size
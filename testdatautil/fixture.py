@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""compact fixture format for python consumers
+
+a table is written to ``<table>.fixture``
+
+- magic bytes, then a pickled header: table name and column names
+- chunks of rows. a chunk is its number of rows and byte size (two
+  little endian uint64), then a pickled list of row tuples
+
+the header is written for the first row only, so files of consecutive
+row ranges can be concatenated. ``read_fixture`` reads the chunk
+headers to count rows, and unpickles a chunk when its rows are used.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from bisect import bisect_right
+from collections import OrderedDict
+import io
+import os
+import pickle
+import struct
+
+MAGIC = b'TDUFIX1\n'
+EXT = '.fixture'
+_CHUNK = struct.Struct('<QQ')
+
+
+def write_header(fio, name, columns):
+    fio.write(MAGIC)
+    header = pickle.dumps({'table': name, 'columns': list(columns)},
+                          protocol=pickle.HIGHEST_PROTOCOL)
+    fio.write(_CHUNK.pack(0, len(header)))
+    fio.write(header)
+
+
+def write_chunk(fio, rows):
+    """write ``rows`` (list of tuples)"""
+    data = pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)
+    fio.write(_CHUNK.pack(len(rows), len(data)))
+    fio.write(data)
+
+
+class FixtureTable(object):
+    """rows of a fixture file, read when accessed
+
+    rows are tuples in the order of ``columns``. indexing keeps the last
+    chunk read, so rows near each other are read from memory.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._chunks = None
+        self._firsts = None
+        self._chunk = (0, [])
+        with io.open(path, 'rb') as fio:
+            if fio.read(len(MAGIC)) != MAGIC:
+                raise ValueError('not a fixture file: {}'.format(path))
+            rows, size = _CHUNK.unpack(fio.read(_CHUNK.size))
+            header = pickle.loads(fio.read(size))
+            self._data_offset = fio.tell()
+        self.name = header['table']
+        self.columns = header['columns']
+
+    def _index(self):
+        """[(first row, rows, offset of data, byte size), ...] of chunks"""
+        if self._chunks is None:
+            chunks = []
+            first = 0
+            end = os.path.getsize(self.path)
+            with io.open(self.path, 'rb') as fio:
+                offset = self._data_offset
+                while offset < end:
+                    fio.seek(offset)
+                    rows, size = _CHUNK.unpack(fio.read(_CHUNK.size))
+                    chunks.append((first, rows, offset + _CHUNK.size, size))
+                    first += rows
+                    offset += _CHUNK.size + size
+            self._chunks = chunks
+            self._firsts = [chunk[0] for chunk in chunks]
+        return self._chunks
+
+    def __len__(self):
+        chunks = self._index()
+        if not chunks:
+            return 0
+        first, rows, offset, size = chunks[-1]
+        return first + rows
+
+    def chunks(self):
+        """iterate lists of rows, one chunk at a time"""
+        with io.open(self.path, 'rb') as fio:
+            fio.seek(self._data_offset)
+            while True:
+                head = fio.read(_CHUNK.size)
+                if not head:
+                    return
+                rows, size = _CHUNK.unpack(head)
+                yield pickle.loads(fio.read(size))
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            for row in chunk:
+                yield row
+
+    def dicts(self):
+        """iterate rows as dicts of column name to value"""
+        columns = self.columns
+        for row in self:
+            yield dict(zip(columns, row))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        first, rows = self._chunk
+        if not first <= index < first + len(rows):
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            number = bisect_right(self._firsts, index) - 1
+            first, count, offset, size = self._chunks[number]
+            with io.open(self.path, 'rb') as fio:
+                fio.seek(offset)
+                rows = pickle.loads(fio.read(size))
+            self._chunk = (first, rows)
+        return rows[index - first]
+
+
+def read_fixture(path):
+    return FixtureTable(path)
+
+
+class Fixture(object):
+    """tables of fixture files of a directory, opened when accessed"""
+    def __init__(self, directory):
+        self.directory = directory
+        self._tables = OrderedDict()
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(EXT):
+                self._tables[filename[:-len(EXT)]] = None
+
+    def keys(self):
+        return list(self._tables.keys())
+
+    def __contains__(self, name):
+        return name in self._tables
+
+    def __getitem__(self, name):
+        table = self._tables[name]
+        if table is None:
+            table = FixtureTable(os.path.join(self.directory, name + EXT))
+            self._tables[name] = table
+        return table
+
+
+def load_fixtures(directory):
+    return Fixture(directory)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from array import array
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class KeyPool(object):
+    """keys generated for a parent column
+
+    a pool is shared by copies of the column, so keys recorded while
+    generating the parent table can be drawn by child tables.
+    """
+    def __deepcopy__(self, memo):
+        return self
+
+    def __len__(self):
+        raise NotImplementedError()
+
+    def __getitem__(self, index):
+        raise NotImplementedError()
+
+    def take(self, indexes):
+        """keys at ``indexes`` (numpy array)"""
+        raise NotImplementedError()
+
+    def record(self, start, values):
+        """record keys generated for rows from ``start``"""
+        raise NotImplementedError()
+
+
+class RangeKeyPool(KeyPool):
+    """keys of a counter, stored as a range
+
+    memory does not depend on the number of keys.
+    """
+    def __init__(self, start_value, step, length=0):
+        self._start_value = start_value
+        self._step = step
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def set_length(self, length):
+        self._length = length
+
+    def __getitem__(self, index):
+        return self._start_value + self._step * index
+
+    def take(self, indexes):
+        return indexes * self._step + self._start_value
+
+    def record(self, start, values):
+        self._length = max(self._length, start + len(values))
+
+
+class ArrayKeyPool(KeyPool):
+    """keys stored in array, or in list if keys are not integers"""
+    def __init__(self):
+        self._values = array(str('q'))
+
+    def clear(self):
+        self._values = array(str('q'))
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def take(self, indexes):
+        if isinstance(self._values, array):
+            return numpy.frombuffer(self._values, dtype=numpy.int64)[indexes]
+        return [self._values[i] for i in indexes.tolist()]
+
+    def record(self, start, values):
+        if hasattr(values, 'tolist'):
+            values = values.tolist()
+        skip = len(self._values) - start
+        if skip >= len(values):
+            return
+        values = values[max(skip, 0):]
+        if isinstance(self._values, array):
+            try:
+                self._values.extend(array(str('q'), values))
+                return
+            except (TypeError, OverflowError):
+                self._values = list(self._values)
+        self._values.extend(values)
+
+
+def create_key_pool(factory):
+    """pool for keys generated by ``factory``"""
+    from testdata import CountingFactory
+    if (isinstance(factory, CountingFactory) and
+            type(factory).__call__ is CountingFactory.__call__):
+        return RangeKeyPool(factory._start_value, factory._step)
+    return ArrayKeyPool()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""generation plan saved to a file
+
+a plan is the metadata built by ``from_sqlalchemy_tables``: tables, columns
+and the factories chosen by the rules. loading a plan skips reflection and
+rule matching. the plan is keyed by a hash of the database schema and the
+rule set, and is rebuilt when either changes.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import gzip
+import hashlib
+import os
+import pickle
+
+PLAN_VERSION = 1
+
+_INFORMATION_SCHEMA = [
+    'SELECT * FROM information_schema.columns WHERE table_schema = :schema',
+    'SELECT * FROM information_schema.table_constraints WHERE table_schema = :schema',
+    'SELECT * FROM information_schema.key_column_usage WHERE table_schema = :schema',
+]
+
+
+def _digest(lines):
+    sha = hashlib.sha256()
+    for line in lines:
+        sha.update(line.encode('utf-8'))
+        sha.update(b'\n')
+    return sha.hexdigest()
+
+
+def schema_fingerprint(engine, schema=None):
+    """hash of table definitions of the database
+
+    read from the catalog in a few queries, without reflecting tables.
+    """
+    from sqlalchemy import inspect, text
+    with engine.connect() as connection:
+        if engine.dialect.name == 'sqlite':
+            rows = connection.execute(text(
+                'SELECT type, name, tbl_name, sql FROM sqlite_master '
+                'WHERE name NOT LIKE \'sqlite_%\''))
+            lines = sorted(repr(tuple(row)) for row in rows)
+        else:
+            if schema is None:
+                schema = inspect(engine).default_schema_name
+            lines = []
+            for query in _INFORMATION_SCHEMA:
+                rows = connection.execute(text(query), {'schema': schema})
+                lines.append(query)
+                lines.extend(sorted(repr(tuple(row)) for row in rows))
+    return _digest(lines)
+
+
+def tables_fingerprint(tables):
+    """hash of definitions of SQLAlchemy Table objects, without a database"""
+    from sqlalchemy.schema import CreateTable
+    return _digest(str(CreateTable(table)).strip() for table in tables)
+
+
+def rule_set_fingerprint(rule_set):
+    """hash of rule classes, priorities and parameters of the rule set
+
+    parameters include base dates of date rules. the defaults of
+    ``SqlAlchemyRuleSet.create()`` are relative to today, so the hash changes
+    every day unless ``basedate`` is given.
+    """
+    lines = []
+    for priority, rule in rule_set.rules + rule_set.table_rules:
+        cls = rule.__class__
+        params = sorted((key, repr(value)) for key, value in vars(rule).items())
+        lines.append('{}:{}.{}:{!r}'.format(priority, cls.__module__,
+                                            cls.__name__, params))
+    return _digest(lines)
+
+
+def plan_key(schema_hash, rule_set):
+    return _digest([str(PLAN_VERSION), schema_hash,
+                    rule_set_fingerprint(rule_set)])
+
+
+def save_plan(path, metadata, key):
+    """write metadata to ``path``. written to a temporary file and renamed"""
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with gzip.GzipFile(temp_path, 'wb', mtime=0) as fio:
+        pickle.dump({'version': PLAN_VERSION, 'key': key, 'metadata': metadata},
+                    fio, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
+def load_plan(path, key):
+    """metadata saved in ``path``, or None if missing or the key differs"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.GzipFile(path, 'rb') as fio:
+            plan = pickle.load(fio)
+    except Exception:
+        return None
+    if plan.get('version') != PLAN_VERSION or plan.get('key') != key:
+        return None
+    return plan['metadata']
+
+
+def load_or_build(path, key, build):
+    """load plan from ``path``, or call ``build()`` and save its result"""
+    metadata = load_plan(path, key)
+    if metadata is None:
+        metadata = build()
+        save_plan(path, metadata, key)
+    return metadata
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""pools of values pre-generated by Faker providers
+
+a factory sampling a pool by index (``PoolFactory``) is much faster than
+calling Faker per row. pools depend only on provider, size and seed, and
+can be cached on disk between runs.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import io
+import json
+import os
+from .rng import derive_seed
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+_pools = dict()
+
+
+class ValuePool(object):
+    """list of values
+
+    a pool is shared by copies of factories, like ``keypool.KeyPool``.
+    """
+    def __init__(self, values):
+        self._values = list(values)
+        self._array = None
+        self._truncated = dict()
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __getstate__(self):
+        return {'_values': self._values}
+
+    def __setstate__(self, state):
+        self.__init__(state['_values'])
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def take(self, indexes):
+        """values at ``indexes`` (numpy array)"""
+        if self._array is None:
+            self._array = numpy.empty(len(self._values), dtype=object)
+            self._array[:] = self._values
+        return self._array[indexes]
+
+    def truncated(self, length):
+        """pool of values cut to ``length`` characters"""
+        if length is None:
+            return self
+        pool = self._truncated.get(length)
+        if pool is None:
+            pool = ValuePool(value[:length] for value in self._values)
+            self._truncated[length] = pool
+        return pool
+
+
+def _generate(provider, size, seed):
+    from faker import Faker
+    faker = Faker()
+    faker.seed_instance(derive_seed(seed, provider))
+    method = getattr(faker, provider)
+    return [method() for _ in range(size)]
+
+
+def value_pool(provider, size, seed=0, cache_dir=None):
+    """pool of ``size`` values of Faker ``provider``
+
+    pools are kept per process, and in ``cache_dir`` if given.
+    """
+    key = (provider, size, seed)
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    values = None
+    if cache_dir is not None:
+        from faker import VERSION as FAKER_VERSION
+        path = os.path.join(cache_dir, '{}-{}-{}-faker{}.json'.format(
+            provider, size, seed, FAKER_VERSION))
+        if os.path.exists(path):
+            with io.open(path, encoding='utf-8') as fio:
+                values = json.load(fio)
+    if values is None:
+        values = _generate(provider, size, seed)
+        if cache_dir is not None:
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            temp_path = '{}.{}.tmp'.format(path, os.getpid())
+            with io.open(temp_path, 'w', encoding='utf-8') as fio:
+                fio.write(json.dumps(values, ensure_ascii=False))
+            os.replace(temp_path, path)
+    pool = ValuePool(values)
+    _pools[key] = pool
+    return pool
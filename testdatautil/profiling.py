@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""profiling of generation
+
+while a profiler is enabled, call counts and time are collected for
+each table (``Table.__call__``, ``Table.generate_batch``), column
+(``Column.__call__``, ``Column.generate_batch``) and formatter
+(``Formatter.write_file``). per row calls are timed once every
+``sample_interval`` calls, and their total time is estimated from the
+samples. when no profiler is enabled, instrumented code only checks
+``profiling.active``.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import json
+import time
+
+active = None
+
+
+class Profiler(object):
+    """call counts and time by key (kind, table, name)
+
+    :param sample_interval: time one of this number of per row calls
+    """
+    def __init__(self, sample_interval=100):
+        self.sample_interval = sample_interval
+        # key -> [calls, timed calls, time of timed calls, rows]
+        self.stats = dict()
+
+    def _stat(self, key):
+        stat = self.stats.get(key)
+        if stat is None:
+            stat = self.stats[key] = [0, 0, 0.0, 0]
+        return stat
+
+    def call(self, key, func, *args):
+        """call ``func`` generating one row, timed by sampling"""
+        stat = self._stat(key)
+        stat[0] += 1
+        stat[3] += 1
+        if stat[0] % self.sample_interval:
+            return func(*args)
+        started = time.perf_counter()
+        result = func(*args)
+        stat[1] += 1
+        stat[2] += time.perf_counter() - started
+        return result
+
+    def call_batch(self, key, rows, func, *args, **kwargs):
+        """call ``func`` generating ``rows`` rows, always timed"""
+        stat = self._stat(key)
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        stat[0] += 1
+        stat[1] += 1
+        stat[2] += time.perf_counter() - started
+        stat[3] += rows
+        return result
+
+    def pop_stats(self):
+        """collected stats, which are cleared"""
+        stats = self.stats
+        self.stats = dict()
+        return stats
+
+    def merge(self, stats):
+        """add stats collected by another profiler (e.g. of a worker process)"""
+        for key, other in stats.items():
+            stat = self._stat(key)
+            for i, value in enumerate(other):
+                stat[i] += value
+
+    def report(self):
+        """stats as list of dicts, most expensive first
+
+        ``time`` of sampled calls is estimated from the timed calls.
+        time of tables includes time of their columns.
+        """
+        items = []
+        for (kind, table, name), (calls, timed, elapsed, rows) in self.stats.items():
+            if timed:
+                elapsed = elapsed * calls / timed
+            items.append({'kind': kind, 'table': table, 'name': name,
+                          'calls': calls, 'rows': rows, 'time': elapsed})
+        items.sort(key=lambda item: item['time'], reverse=True)
+        return items
+
+    def write(self, path):
+        with open(path, 'w') as fio:
+            json.dump({'sample_interval': self.sample_interval,
+                       'stats': self.report()}, fio, indent=2)
+
+    def format_report(self, limit=30):
+        lines = ['{:<8} {:<20} {:<24} {:>10} {:>12} {:>10}'.format(
+            'kind', 'table', 'name', 'calls', 'rows', 'seconds')]
+        for item in self.report()[:limit]:
+            lines.append('{:<8} {:<20} {:<24} {:>10} {:>12} {:>10.3f}'.format(
+                item['kind'], item['table'] or '', item['name'] or '',
+                item['calls'], item['rows'], item['time']))
+        return '\n'.join(lines)
+
+
+def enable(sample_interval=100):
+    """start collecting stats with a new profiler"""
+    global active
+    active = Profiler(sample_interval=sample_interval)
+    return active
+
+
+def disable():
+    global active
+    profiler = active
+    active = None
+    return profiler
+
+
+def call_batch(key, rows, func, *args, **kwargs):
+    """``func(*args, **kwargs)``, timed if a profiler is enabled"""
+    if active is None:
+        return func(*args, **kwargs)
+    return active.call_batch(key, rows, func, *args, **kwargs)
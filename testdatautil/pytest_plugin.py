@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""pytest plugin providing a generated dataset
+
+override the ``testdata_spec`` fixture in conftest.py::
+
+    @pytest.fixture(scope='session')
+    def testdata_spec():
+        return DatasetSpec(Base.metadata.sorted_tables, seed=1, length=1000)
+
+and use the ``testdata`` fixture (``cache.Dataset``) in tests. the dataset is
+generated once and cached in the pytest cache directory (cleared by
+--cache-clear), or --testdata-cache. xdist workers wait for the worker
+generating it.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import os
+import pytest
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('testdatautil')
+    group.addoption('--testdata-cache', dest='testdata_cache', metavar='DIR',
+                    help='directory of cached datasets of the testdata fixture')
+
+
+@pytest.fixture(scope='session')
+def testdata_spec():
+    """``cache.DatasetSpec`` of the testdata fixture. override this"""
+    pytest.fail('override the testdata_spec fixture to use the testdata fixture')
+
+
+@pytest.fixture(scope='session')
+def testdata_cache_dir(request):
+    config = request.config
+    directory = config.getoption('testdata_cache')
+    if directory:
+        return os.path.expanduser(directory)
+    cache = getattr(config, 'cache', None)
+    if cache is not None:
+        return str(cache.mkdir('testdatautil'))
+    return os.path.join(str(config.rootpath), '.testdatautil-cache')
+
+
+@pytest.fixture(scope='session')
+def testdata(testdata_spec, testdata_cache_dir):
+    # imported here, the plugin is loaded by every pytest run
+    from .cache import load_dataset
+    return load_dataset(testdata_spec, testdata_cache_dir)
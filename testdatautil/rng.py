@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+import hashlib
+import random
+import struct
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+def derive_seed(seed, *keys):
+    """derive 64bit seed from base seed and keys (table name, etc.)"""
+    text = ':'.join(['{}'.format(seed)] + ['{}'.format(key) for key in keys])
+    digest = hashlib.sha256(text.encode('utf-8')).digest()
+    return struct.unpack('>Q', digest[:8])[0]
+
+
+def seed_all(seed):
+    """seed every random source used by factories
+
+    random module, numpy and Faker
+    """
+    from faker import Faker
+    random.seed(seed)
+    Faker.seed(seed)
+    if numpy is not None:
+        numpy.random.seed(seed % 2 ** 32)
+
+
+_MASK64 = 2 ** 64 - 1
+_GOLDEN64 = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+_DOUBLE_UNIT = 1.0 / 2 ** 53
+
+
+def random_bits(key, index):
+    """64 random bits of row ``index`` of the stream ``key``
+
+    counter based (splitmix64), so any row can be computed without
+    generating previous rows.
+    """
+    z = (key + (index + 1) * _GOLDEN64) & _MASK64
+    z = ((z ^ (z >> 30)) * _MIX1) & _MASK64
+    z = ((z ^ (z >> 27)) * _MIX2) & _MASK64
+    return z ^ (z >> 31)
+
+
+def uniform(key, index):
+    """float in [0, 1) of row ``index`` of the stream ``key``"""
+    return (random_bits(key, index) >> 11) * _DOUBLE_UNIT
+
+
+def uniform_array(key, start, size):
+    """numpy version of ``uniform`` for rows from ``start`` to ``start + size``"""
+    indexes = numpy.arange(start + 1, start + size + 1, dtype=numpy.uint64)
+    z = numpy.uint64(key & _MASK64) + indexes * numpy.uint64(_GOLDEN64)
+    z = (z ^ (z >> numpy.uint64(30))) * numpy.uint64(_MIX1)
+    z = (z ^ (z >> numpy.uint64(27))) * numpy.uint64(_MIX2)
+    z = z ^ (z >> numpy.uint64(31))
+    return (z >> numpy.uint64(11)).astype(numpy.float64) * _DOUBLE_UNIT
+
+
+def seed_row(key, index):
+    """seed every random source for row ``index`` of the stream ``key``
+
+    fallback for factories which do not draw from counter based streams.
+    """
+    seed_all(random_bits(key, index))
@@ -3,15 +3,18 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from collections import OrderedDict
 from datetime import datetime, date, timedelta
-from testdata import (RandomInteger, Constant, RandomSelection,
-                      RandomLengthStringFactory,
-                      RandomDateFactory, RandomFloat,
-                      DateIntervalFactory,
-                      FakeDataFactory, CountingFactory,
-                      )
-from sqlalchemy.schema import Column as SAColumn
 from testdatautil.schema import Column, Table
-from .factory import WordFactory, PrefixedCountingFactory
+from .unique import UniqueFactory, is_unique_factory
+from .pool import value_pool
+from .factory import (WordFactory, PrefixedCountingFactory, FakeDataFactory,
+                      ForeignKeyFactory, PoolFactory,
+                      BatchConstant, BatchCountingFactory,
+                      BatchDateInterval, BatchRandomDate,
+                      BatchRandomFloat, BatchRandomInteger,
+                      BatchRandomSelection, WeightedChoiceFactory,
+                      )
+from .weighted import load_weights
+from .distribution import ProfiledFactory
 
 
 class RuleContext(object):
@@ -42,16 +45,25 @@ class RuleSet(object):
         return cls(default_rule=default_rule, rules=rules)
 
     @classmethod
-    def match(cls, rules, field, context=None):
+    def find_rule(cls, rules, field, context=None):
         for priority, rule in rules:
             if rule.match_all(field, context):
-                result = rule.build(field)
-                return result
+                return rule
+
+    @classmethod
+    def match(cls, rules, field, context=None):
+        rule = cls.find_rule(rules, field, context)
+        if rule is not None:
+            result = rule.build_with_context(field, context)
+            return result
 
     def __init__(self, default_rule=None, rules=None):
         self._rules = dict()
         self._table_rules = dict()
         self._leng = 0
+        self._sorted_rules = None
+        self._sorted_table_rules = None
+        self._index = None
         if default_rule:
             self.add_rule(default_rule, priority=-123)
         if rules:
@@ -74,21 +86,33 @@ class RuleSet(object):
             priority += 1
         target[priority] = rule
         self._leng += 1
+        self._sorted_rules = None
+        self._sorted_table_rules = None
+        self._index = None
 
     @property
     def rules(self):
-        rules = list(self._rules.items())
-        rules.sort(reverse=True)
-        return rules
+        """(priority, rule) pairs of field rules, highest priority first"""
+        if self._sorted_rules is None:
+            self._sorted_rules = tuple(sorted(self._rules.items(), reverse=True))
+        return self._sorted_rules
 
     @property
     def table_rules(self):
-        rules = list(self._table_rules.items())
-        rules.sort(reverse=True)
-        return rules
+        """(priority, rule) pairs of table rules, highest priority first"""
+        if self._sorted_table_rules is None:
+            self._sorted_table_rules = tuple(sorted(self._table_rules.items(),
+                                                    reverse=True))
+        return self._sorted_table_rules
+
+    def compile(self):
+        """dispatch index of field rules. rebuilt after add_rule"""
+        if self._index is None:
+            self._index = RuleIndex(self.rules)
+        return self._index
 
     def apply_all(self, metadata, tables):
-        rules = self.rules
+        index = self.compile()
         table_rules = self.table_rules
         table_factories = OrderedDict()
         rule_context = RuleContext(self)
@@ -101,10 +125,16 @@ class RuleSet(object):
                 # apply field rules
                 args = [table_name, metadata]
                 for field_name, field in table_data.items():
-                    factory = self.match(rules, field, rule_context)
-                    args.append(Column(field_name, factory))
+                    rule = index.find_rule(field, rule_context)
+                    factory = None
+                    if rule is not None:
+                        factory = rule.build_with_context(field, rule_context)
+                    python_type = getattr(rule, 'python_type', None)
+                    args.append(Column(field_name, factory,
+                                       python_type=python_type))
 
-                table_factory = Table(*args)
+                unique_together = getattr(table_data, 'unique_together', ())
+                table_factory = Table(*args, unique_together=unique_together)
 
             table_factories[table_name] = table_factory
             rule_context.add_table_factory(table_factory)
@@ -114,19 +144,100 @@ class RuleSet(object):
         return table_factories
 
 
+class RuleIndex(object):
+    """rules compiled into a dispatch index
+
+    sqlalchemy rules are indexed by a condition every match of them requires:
+    field name (SAFieldNameRule), name suffix (SASuffixRule) or
+    python type (SATypeRule). only rules whose condition holds are tried,
+    in priority order, so the result is same as ``RuleSet.find_rule``.
+    """
+    def __init__(self, rules):
+        self._rules = rules
+        self._by_name = dict()
+        self._by_type = dict()
+        self._suffixes = dict()
+        self._generic = []
+        self._sqlalchemy = []
+        self._by_python_type = dict()
+        for order, (priority, rule) in enumerate(rules):
+            entry = (order, rule)
+            matches = rule.match_chain()
+            if SqlAlchemyRule.match not in matches:
+                self._generic.append(entry)
+            elif SAFieldNameRule.match in matches:
+                self._by_name.setdefault(rule.fieldname, []).append(entry)
+            elif SASuffixRule.match in matches:
+                self._suffixes.setdefault(rule.suffix, []).append(entry)
+            elif SATypeRule.match in matches:
+                self._by_type.setdefault(rule.python_type, []).append(entry)
+            else:
+                self._sqlalchemy.append(entry)
+
+    def _type_candidates(self, python_type):
+        entries = self._by_python_type.get(python_type)
+        if entries is None:
+            entries = self._generic + self._sqlalchemy
+            entries = entries + self._by_type.get(python_type, [])
+            entries.sort(key=lambda entry: entry[0])
+            self._by_python_type[python_type] = entries
+        return entries
+
+    def candidates(self, field):
+        """rules which may match the field, in priority order"""
+        from sqlalchemy.schema import Column as SAColumn
+        if not isinstance(field, SAColumn):
+            return self._rules
+        try:
+            python_type = field.type.python_type
+        except NotImplementedError:
+            return self._rules
+        entries = self._type_candidates(python_type)
+        extra = self._by_name.get(field.name, [])
+        for suffix, suffix_entries in self._suffixes.items():
+            if field.name.endswith(suffix):
+                extra = extra + suffix_entries
+        if extra:
+            entries = sorted(entries + extra, key=lambda entry: entry[0])
+        return entries
+
+    def find_rule(self, field, context=None):
+        for order, rule in self.candidates(field):
+            if rule.match_all(field, context):
+                return rule
+
+
 class Rule(object):
     inherit_rule = True
+    # type of values the built factory returns, if known
+    python_type = None
+    _match_chains = dict()
+
+    def match_chain(self):
+        """match functions which all must return True
+
+        match of every base class if inherit_rule, computed once per class
+        """
+        key = (self.__class__, self.inherit_rule)
+        chain = Rule._match_chains.get(key)
+        if chain is None:
+            chain = []
+            if self.inherit_rule:
+                for base in self.__class__.mro():
+                    if issubclass(base, Rule) and base is not Rule:
+                        if base.match not in chain:
+                            chain.append(base.match)
+            if self.__class__.match not in chain:
+                chain.append(self.__class__.match)
+            Rule._match_chains[key] = chain
+        return chain
 
     def match_all(self, field, context):
         # base classes rule
-        if self.inherit_rule:
-            for base in self.__class__.mro():
-                if issubclass(base, Rule) and base is not Rule:
-                    if not base.match(self, field=field, context=context):
-                        return False
-        if self.match(field, context):
-            return True
-        return False
+        for match in self.match_chain():
+            if not match(self, field, context):
+                return False
+        return True
 
     def match(self, field, context):
         """
@@ -149,6 +260,16 @@ class Rule(object):
         """
         raise NotImplemented()
 
+    def build_with_context(self, field, context):
+        """
+        build with RuleContext. override this if factory depends on other tables
+
+        :param field:
+        :param context:RuleContext
+        :return:Factory
+        """
+        return self.build(field)
+
 
 class TableRule(Rule):
     pass
@@ -167,21 +288,89 @@ class Choice(BottomRule):
         self._choices = choices
 
     def build(self, field):
-        return RandomSelection(sequence=self._choices)
+        return BatchRandomSelection(sequence=self._choices)
+
+
+class WeightedChoice(BottomRule):
+    """draw choices with weights, see ``WeightedChoiceFactory``
+
+    :param choices: dict of choice to weight, or sequence of choices
+    :param weights: weights of ``choices`` if it is a sequence
+    """
+    def __init__(self, choices, weights=None):
+        if weights is None:
+            weights = list(choices.values())
+            choices = list(choices.keys())
+        self._choices = list(choices)
+        self._weights = list(weights)
+
+    @classmethod
+    def from_file(cls, path):
+        """rule of weights in a frequency file, see ``weighted.load_weights``"""
+        return cls(load_weights(path))
+
+    def build(self, field):
+        return WeightedChoiceFactory(self._choices, self._weights)
 
 
 class ConstantNone(BottomRule):
     def build(self, field):
-        return Constant(None)
+        return BatchConstant(None)
+
+
+def is_unique_column(field):
+    """True if values of sqlalchemy column must be unique"""
+    from sqlalchemy.schema import PrimaryKeyConstraint, UniqueConstraint
+    if field.unique:
+        return True
+    table = getattr(field, 'table', None)
+    if table is None:
+        return False
+    for constraint in table.constraints:
+        if isinstance(constraint, (UniqueConstraint, PrimaryKeyConstraint)):
+            # compare by identity, == of columns builds sql expressions
+            columns = list(constraint.columns)
+            if len(columns) == 1 and columns[0] is field:
+                return True
+    return False
 
 
 class SqlAlchemyRule(Rule):
     def match(self, field, context):
+        from sqlalchemy.schema import Column as SAColumn
         return isinstance(field, SAColumn)
 
     def build(self, field):
         raise NotImplemented()
 
+    def build_with_context(self, field, context):
+        factory = super(SqlAlchemyRule, self).build_with_context(field, context)
+        if is_unique_column(field) and not is_unique_factory(factory):
+            factory = UniqueFactory(factory, name=field.name)
+        return factory
+
+
+class ValuePoolMixin(object):
+    """draw values from a pool of pre-generated Faker values
+
+    without ``pool_size``, values are generated by Faker per row.
+
+    :param pool_size: number of values in the pool
+    :param pool_cache: directory where pools are cached between runs
+    :param pool_seed: seed of the pool values
+    """
+    def __init__(self, pool_size=None, pool_cache=None, pool_seed=0):
+        self.pool_size = pool_size
+        self.pool_cache = pool_cache
+        self.pool_seed = pool_seed
+
+    def pooled(self, provider, factory, length=None):
+        if not self.pool_size:
+            return factory
+        pool = value_pool(provider, self.pool_size, seed=self.pool_seed,
+                          cache_dir=self.pool_cache)
+        return PoolFactory(pool.truncated(length))
+
 
 class SAFieldNameRule(SqlAlchemyRule):
     fieldname = None
@@ -208,17 +397,17 @@ class SAInteger(SATypeRule):
     python_type = int
 
     def build(self, field):
-        return RandomInteger(minimum=0, maximum=100)
+        return BatchRandomInteger(minimum=0, maximum=100)
 
 
 class SAFloat(SATypeRule):
     python_type = float
 
     def build(self, field):
-        return RandomFloat(minimum=0.0, maximum=100.0)
+        return BatchRandomFloat(minimum=0.0, maximum=100.0)
 
 
-class SAString(SATypeRule):
+class SAString(ValuePoolMixin, SATypeRule):
     python_type = str
 
     def build(self, field):
@@ -226,8 +415,9 @@ class SAString(SATypeRule):
         if hasattr(field, 'length'):
             length = field.length
         if length < 5 or field.unique:
+            from testdata import RandomLengthStringFactory
             return RandomLengthStringFactory(min_chars=0, max_chars=length)
-        return WordFactory(length=length)
+        return self.pooled('word', WordFactory(length=length), length=length)
 
 
 class SADateTime(SATypeRule):
@@ -240,7 +430,7 @@ class SADateTime(SATypeRule):
 
     def build(self, field):
         base = self._basedate
-        return RandomDateFactory(minimum=base, maximum=base + timedelta(days=1))
+        return BatchRandomDate(minimum=base, maximum=base + timedelta(days=1))
 
 
 class SADate(SATypeRule):
@@ -253,7 +443,7 @@ class SADate(SATypeRule):
 
     def build(self, field):
         base = self._basedate
-        return RandomDateFactory(minimum=base, maximum=base + timedelta(days=10))
+        return BatchRandomDate(minimum=base, maximum=base + timedelta(days=10))
 
 
 class SADateTimeSequence(SATypeRule):
@@ -266,7 +456,7 @@ class SADateTimeSequence(SATypeRule):
 
     def build(self, field):
         base = self._basedate
-        return DateIntervalFactory(base=base, delta=timedelta(seconds=121))
+        return BatchDateInterval(base=base, delta=timedelta(seconds=121))
 
 
 class SADateSequence(SATypeRule):
@@ -279,14 +469,22 @@ class SADateSequence(SATypeRule):
 
     def build(self, field):
         base = self._basedate
-        return DateIntervalFactory(base=base, delta=timedelta(days=1))
+        return BatchDateInterval(base=base, delta=timedelta(days=1))
 
 
 class SABoolean(SATypeRule):
+    """
+    :param true_rate: probability of 1. 0.5 if None
+    """
     python_type = bool
 
+    def __init__(self, true_rate=None):
+        self._true_rate = true_rate
+
     def build(self, field):
-        return RandomSelection(sequence=(1, 0))
+        if self._true_rate is None:
+            return BatchRandomSelection(sequence=(1, 0))
+        return WeightedChoiceFactory((1, 0), (self._true_rate, 1 - self._true_rate))
 
 
 class SAIntUnique(SAInteger):
@@ -294,7 +492,7 @@ class SAIntUnique(SAInteger):
         return field.unique
 
     def build(self, field):
-        return CountingFactory(1)
+        return BatchCountingFactory(1)
 
 
 class SAStrUnique(SAString):
@@ -305,18 +503,20 @@ class SAStrUnique(SAString):
         return PrefixedCountingFactory(prefix=field.name + '_')
 
 
-class SAEmail(SASuffixRule):
+class SAEmail(ValuePoolMixin, SASuffixRule):
     suffix = 'mail'
+    python_type = str
 
     def build(self, field):
-        return FakeDataFactory('email')
+        return self.pooled('email', FakeDataFactory('email'))
 
 
-class SAName(SASuffixRule):
+class SAName(ValuePoolMixin, SASuffixRule):
     suffix = "name"
+    python_type = str
 
     def build(self, field):
-        return FakeDataFactory('first_name')
+        return self.pooled('first_name', FakeDataFactory('first_name'))
 
 
 class SAAutoIncrement(SAInteger):
@@ -324,25 +524,99 @@ class SAAutoIncrement(SAInteger):
         return field.primary_key
 
     def build(self, field):
-        return CountingFactory(1)
+        return BatchCountingFactory(1)
+
+
+class SAForeignKey(SqlAlchemyRule):
+    """
+    draw values from keys generated for the referenced column
+    """
+    def find_parent(self, field, context):
+        if context is None:
+            return None
+        for foreign_key in field.foreign_keys:
+            names = foreign_key.target_fullname.split('.')
+            parent = context.find_field(names[-2], names[-1])
+            if parent is not None:
+                return parent
+
+    def match(self, field, context):
+        return self.find_parent(field, context) is not None
+
+    def build_with_context(self, field, context):
+        parent = self.find_parent(field, context)
+        return ForeignKeyFactory(parent.get_key_pool())
+
+
+class ProfiledRule(SqlAlchemyRule):
+    """
+    draw values matching the profile of the column in the source database.
+    unique columns and foreign keys are left to other rules.
+
+    :param profiles: {table name: {column name: profile}},
+        see ``distribution.profile_database``
+    """
+    def __init__(self, profiles):
+        self._profiles = profiles
+
+    def find_profile(self, field):
+        table = getattr(field, 'table', None)
+        if table is None:
+            return None
+        return self._profiles.get(table.name, {}).get(field.name)
+
+    def match(self, field, context):
+        return (self.find_profile(field) is not None and not field.foreign_keys and
+                not is_unique_column(field))
+
+    def build(self, field):
+        return ProfiledFactory(self.find_profile(field))
 
 
 class SqlAlchemyRuleSet(RuleSet):
     @classmethod
-    def create(cls, default_rule=None, rules=None):
+    def create(cls, default_rule=None, rules=None, pool_size=None,
+               pool_cache=None, basedate=None):
+        """
+        :param pool_size: text rules draw from pools of this number of
+            pre-generated values, see ``ValuePoolMixin``
+        :param pool_cache: directory where the pools are cached
+        :param basedate: first date of date and datetime columns.
+            default is 10 days before today, so fingerprints of the rule set
+            (``plan.rule_set_fingerprint``) change every day
+        """
         # default sqlalchemy rule set
-        basedate = date.today() - timedelta(days=10)
-        basedatetime = datetime.now() - timedelta(days=10)
+        pool = dict(pool_size=pool_size, pool_cache=pool_cache)
+        if basedate is None:
+            basedate = date.today() - timedelta(days=10)
+        # midnight, so fingerprints of the rule set are stable during the day
+        basedatetime = datetime.combine(basedate, datetime.min.time())
         rule_set = RuleSet.create(default_rule=ConstantNone())
         rule_set.add_rule(SAInteger())
         rule_set.add_rule(SAFloat())
-        rule_set.add_rule(SAString())
+        rule_set.add_rule(SAString(**pool))
         rule_set.add_rule(SADateTime(basedatetime))
         rule_set.add_rule(SADate(basedate))
         rule_set.add_rule(SABoolean())
-        rule_set.add_rule(SAName())
-        rule_set.add_rule(SAEmail())
+        rule_set.add_rule(SAName(**pool))
+        rule_set.add_rule(SAEmail(**pool))
         rule_set.add_rule(SAIntUnique())
         rule_set.add_rule(SAStrUnique())
+        rule_set.add_rule(SAForeignKey(), priority=9000)
         rule_set.add_rule(SAAutoIncrement(), priority=9999)
         return rule_set
+
+
+class ProfiledRuleSet(SqlAlchemyRuleSet):
+    @classmethod
+    def create(cls, profiles, default_rule=None, rules=None, pool_size=None,
+               pool_cache=None, basedate=None):
+        """default sqlalchemy rule set, with ``ProfiledRule`` before type rules
+
+        foreign keys and auto increment keys are still drawn by their rules.
+        """
+        rule_set = SqlAlchemyRuleSet.create(default_rule=default_rule, rules=rules,
+                                            pool_size=pool_size, pool_cache=pool_cache,
+                                            basedate=basedate)
+        rule_set.add_rule(ProfiledRule(profiles), priority=1000)
+        return rule_set
@@ -2,7 +2,26 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from collections import OrderedDict
+from copy import deepcopy
 from testdata.base import Factory
+from . import profiling
+from .factory import to_list
+from .keypool import create_key_pool
+from .rng import derive_seed, seed_all, seed_row
+from .unique import (UniqueFactory, ValueSet, is_unique_factory, redraw,
+                     value_space, warn_value_space)
+
+
+def seek_factory(factory, index):
+    """move factory to row ``index``
+
+    factories whose value depends on current_index (CountingFactory,
+    DateIntervalFactory, ...) resume from the row.
+    """
+    if hasattr(factory, 'seek'):
+        factory.seek(index)
+    else:
+        factory._current_index = index
 
 
 class MetaData(object):
@@ -25,7 +44,13 @@ class MetaData(object):
 
 
 class Table(Factory):
-    def __init__(self, name, metadata, *columns):
+    """
+    :param unique_together: list of column name tuples. combination of
+        values of the columns is unique
+    """
+    max_retries = 100
+
+    def __init__(self, name, metadata, *columns, **kwargs):
         self.name = name
         self.metadata = metadata
         self.columns = columns
@@ -36,11 +61,27 @@ class Table(Factory):
             self._dic[col.name] = col
 
         self._keys = keys
+        for col in self.columns:
+            col.table_name = name
+        self._seed = None
+        self._seed_interval = None
+        self._seed_origin = 0
+        self.unique_together = [tuple(names)
+                                for names in kwargs.get('unique_together', ())]
+        self._unique_sets = []
+        for names in self.unique_together:
+            factories = [self._dic[name].factory for name in names]
+            if any(is_unique_factory(factory) for factory in factories):
+                continue
+            self._unique_sets.append((names, ValueSet()))
         Factory.__init__(self)
 
     def __getitem__(self, item):
         return self._dic[item]
 
+    def get(self, item, default=None):
+        return self._dic.get(item, default)
+
     def __iter__(self):
         columns = []
         for col in self.columns:
@@ -51,6 +92,120 @@ class Table(Factory):
     def keys(self):
         return self._keys
 
+    def set_seed(self, seed, interval=None, origin=0):
+        """reseed random sources when generating rows
+
+        random sources are reseeded at the first row, and every ``interval`` rows
+        if given, with a seed derived from ``seed`` and the block number.
+        so a block generates the same rows wherever it starts.
+
+        :param origin: first row of the blocks. rows appended to a table
+            are generated in blocks from the previous number of rows
+        """
+        # stop drawing from the streams of ``set_row_seed``
+        for col in self.columns:
+            col.seed_rows(None)
+        self._seed = seed
+        self._seed_interval = interval
+        self._seed_origin = origin
+
+    def _reseed_if_needed(self):
+        if self._seed is None:
+            return
+        index = self.current_index - self._seed_origin
+        interval = self._seed_interval
+        if index == 0 or (interval and index % interval == 0):
+            block = index // interval if interval else 0
+            if self._seed_origin:
+                seed_all(derive_seed(self._seed, self.name, 'from',
+                                     self._seed_origin, block))
+            else:
+                seed_all(derive_seed(self._seed, self.name, block))
+
+    def enforces_unique(self):
+        """True if generated values are checked for uniqueness
+
+        values are unique from row 0 and depend on previous rows, so such
+        a table is generated in order from row 0, not in separate shards.
+        """
+        return bool(self._unique_sets) or any(isinstance(col.factory, UniqueFactory)
+                                              for col in self.columns)
+
+    def reset_unique(self):
+        """forget generated values of unique columns
+
+        called when generation starts at row 0. the sets are shared by copies
+        of the table, so copies generating later rows keep checking them.
+        """
+        for names, seen in self._unique_sets:
+            seen.clear()
+        for col in self.columns:
+            if hasattr(col.factory, 'reset_unique'):
+                col.factory.reset_unique()
+
+    def _warn_unique_together(self, element_amount):
+        for names in self.unique_together:
+            space = 1
+            for name in names:
+                factory = self._dic[name].factory
+                if is_unique_factory(factory):
+                    space = None
+                    break
+                col_space = value_space(factory)
+                if col_space is None:
+                    space = None
+                    break
+                space *= col_space
+            warn_value_space('{}({})'.format(self.name, ', '.join(names)),
+                             space, element_amount)
+
+    def _redraw_row(self, values, names, index, attempt):
+        if attempt > self.max_retries:
+            raise ValueError('could not generate unique values for {}({}) '
+                             'after {} retries'.format(self.name, ', '.join(names),
+                                                       self.max_retries))
+        for name in names:
+            col = self._dic[name]
+            seek_factory(col.factory, index)
+            values[name] = redraw(col.factory, attempt)
+
+    def _enforce_unique(self, result, size):
+        start = self.current_index
+        for names, seen in self._unique_sets:
+            columns = dict((name, to_list(result[name])) for name in names)
+            for offset in range(size):
+                attempt = 0
+                while not seen.add(tuple(columns[name][offset] for name in names)):
+                    attempt += 1
+                    row = dict()
+                    self._redraw_row(row, names, start + offset, attempt)
+                    for name in names:
+                        columns[name][offset] = row[name]
+            for name in names:
+                seek_factory(self._dic[name].factory, start + size)
+                result[name] = columns[name]
+
+    def set_row_seed(self, seed):
+        """draw values of each column from a counter based stream
+
+        the stream is keyed by (seed, table name, column name), so a value only
+        depends on the row index and any row range can be regenerated alone.
+        """
+        for col in self.columns:
+            col.seed_rows(derive_seed(seed, self.name, col.name))
+
+    def seek(self, index):
+        self._current_index = index
+        for col in self.columns:
+            col.seek(index)
+
+    def generate_range(self, start, stop):
+        """This method returns a Factory that generates rows from ``start`` to ``stop``"""
+        instance = deepcopy(self)
+        instance.set_element_amount(stop)
+        instance.seek(start)
+        return instance
+
     def increase_index(self):
         super(Table, self).increase_index()
         for col in self.columns:
@@ -61,21 +216,99 @@ class Table(Factory):
             col.set_element_amount(element_amount)
 
         super(Table, self).set_element_amount(element_amount)
+        self._warn_unique_together(element_amount)
+        for names, seen in self._unique_sets:
+            seen.set_capacity(element_amount)
 
     def __call__(self, *args, **kwargs):
+        if profiling.active is not None:
+            return profiling.active.call(('table', self.name, None), self._generate_row)
+        return self._generate_row()
+
+    def _generate_row(self):
+        if self.current_index == 0:
+            self.reset_unique()
+        self._reseed_if_needed()
         result = OrderedDict()
         for col in self.columns:
             result[col.name] = col()
 
+        for names, seen in self._unique_sets:
+            attempt = 0
+            while not seen.add(tuple(result[name] for name in names)):
+                attempt += 1
+                self._redraw_row(result, names, self.current_index, attempt)
+        return result
+
+    def generate_batch(self, size):
+        """generate next ``size`` rows at once
+
+        :param size: number of rows
+        :return: OrderedDict of column name to values (list or numpy array)
+        """
+        return profiling.call_batch(('table', self.name, None), size,
+                                    self._generate_batch, size)
+
+    def _generate_batch(self, size):
+        if self.current_index == 0:
+            self.reset_unique()
+        self._reseed_if_needed()
+        result = OrderedDict()
+        for col in self.columns:
+            result[col.name] = col.generate_batch(size)
+
+        if self._unique_sets:
+            self._enforce_unique(result, size)
+        self._current_index += size
         return result
 
+    def batches(self, batch_size):
+        """iterate remaining rows by batch of ``batch_size`` rows"""
+        while self.current_index < self.element_amount:
+            size = min(batch_size, self.element_amount - self.current_index)
+            if self._seed is not None and self._seed_interval:
+                # do not cross reseeding points
+                index = self.current_index - self._seed_origin
+                rest = self._seed_interval - index % self._seed_interval
+                size = min(size, rest)
+            yield self.generate_batch(size)
+
 
 class Column(Factory):
-    def __init__(self, name, factory):
+    """
+    :param python_type: type of values, if known. used by formatters
+    """
+    # set by Table
+    table_name = None
+
+    def __init__(self, name, factory, python_type=None):
         self.name = name
         self.factory = factory
+        self.python_type = python_type
+        self.key_pool = None
+        self._row_key = None
         Factory.__init__(self)
 
+    def get_key_pool(self):
+        """pool of values generated by this column, for foreign keys"""
+        if self.key_pool is None:
+            self.key_pool = create_key_pool(self.factory)
+        return self.key_pool
+
+    def seed_rows(self, key):
+        """draw values from the counter based stream ``key``
+
+        factories without ``seed_rows`` are supported by reseeding
+        random sources (random, Faker and numpy) before every value, which
+        costs about 20us per value. batch factories support ``seed_rows``.
+
+        :param key: None to draw from the random sources again
+        """
+        if hasattr(self.factory, 'seed_rows'):
+            self.factory.seed_rows(key)
+        else:
+            self._row_key = key
+
     def __iter__(self):
         self.factory = iter(self.factory)
         return super(Column, self).__iter__()
@@ -88,5 +321,47 @@ class Column(Factory):
         super(Column, self).increase_index()
         self.factory.increase_index()
 
+    def seek(self, index):
+        self._current_index = index
+        seek_factory(self.factory, index)
+
     def __call__(self, *args, **kwargs):
-        return self.factory()
+        if profiling.active is not None:
+            return profiling.active.call(('column', self.table_name, self.name),
+                                         self._generate_value)
+        return self._generate_value()
+
+    def _generate_value(self):
+        if self._row_key is not None:
+            seed_row(self._row_key, self.current_index)
+        value = self.factory()
+        if self.key_pool is not None:
+            self.key_pool.record(self.current_index, [value])
+        return value
+
+    def generate_batch(self, size):
+        """generate next ``size`` values
+
+        use ``factory.batch`` if factory supports it, otherwise call factory per row.
+        """
+        return profiling.call_batch(('column', self.table_name, self.name), size,
+                                    self._generate_batch, size)
+
+    def _generate_batch(self, size):
+        factory = self.factory
+        if hasattr(factory, 'batch'):
+            values = factory.batch(size)
+        else:
+            values = []
+            row_key = self._row_key
+            for index in range(self.current_index, self.current_index + size):
+                if row_key is not None:
+                    seed_row(row_key, index)
+                values.append(factory())
+                factory.increase_index()
+
+        if self.key_pool is not None:
+            self.key_pool.record(self.current_index, values)
+        self._current_index += size
+        return values
+
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from datetime import datetime, date
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+import math
+
+
+def format_value(val):
+    """format one value as text"""
+    if isinstance(val, datetime):
+        return datetime.strftime(val, "%Y-%m-%d %H:%M:%S")
+    elif isinstance(val, date):
+        return date.strftime(val, "%Y-%m-%d")
+    elif val is None:
+        return ''
+    elif isinstance(val, bool):
+        return "1" if val else "0"
+    return str(val)
+
+
+def _fill_none(values, result):
+    if None in values:
+        return ['' if val is None else res for val, res in zip(values, result)]
+    return result
+
+
+def _serialize_any(values):
+    return [format_value(val) for val in values]
+
+
+def _serialize_str(values):
+    return _fill_none(values, list(map(str, values)))
+
+
+def _serialize_bool(values):
+    return [('1' if val else '0') if val is not None else '' for val in values]
+
+
+def _serialize_temporal(values):
+    # str() of date/datetime is isoformat. seconds are the 19th character
+    return _fill_none(values, [str(val)[:19] for val in values])
+
+
+_SERIALIZERS = {
+    int: _serialize_str,
+    float: _serialize_str,
+    str: _serialize_str,
+    bool: _serialize_bool,
+    datetime: _serialize_temporal,
+    date: _serialize_temporal,
+}
+
+
+def compile_serializer(python_type):
+    """function to format a list of values of ``python_type`` as text
+
+    the result is same as ``format_value`` of each value.
+    """
+    return _SERIALIZERS.get(python_type, _serialize_any)
+
+
+def compile_serializers(dataschema):
+    """serializers for each column of the table"""
+    return [compile_serializer(getattr(col, 'python_type', None))
+            for col in dataschema.columns]
+
+
+def _json_fill_null(values, result):
+    if None in values:
+        return ['null' if val is None else res for val, res in zip(values, result)]
+    return result
+
+
+def _json_value(val):
+    if val is None:
+        return 'null'
+    elif isinstance(val, bool):
+        return 'true' if val else 'false'
+    elif isinstance(val, int):
+        return repr(val)
+    elif isinstance(val, float):
+        # NaN and infinity are not valid JSON
+        return repr(val) if math.isfinite(val) else 'null'
+    elif isinstance(val, (datetime, date)):
+        return '"{}"'.format(format_value(val))
+    return encode_basestring_ascii(str(val))
+
+
+def _json_any(values):
+    return [_json_value(val) for val in values]
+
+
+def _json_int(values):
+    return _json_fill_null(values, list(map(str, values)))
+
+
+_NON_FINITE = frozenset(['nan', 'inf', '-inf'])
+
+
+def _json_float(values):
+    result = _json_fill_null(values, list(map(repr, values)))
+    if not _NON_FINITE.isdisjoint(result):
+        # NaN and infinity are not valid JSON
+        return ['null' if text in _NON_FINITE else text for text in result]
+    return result
+
+
+def _json_bool(values):
+    return [('true' if val else 'false') if val is not None else 'null'
+            for val in values]
+
+
+def _json_str(values):
+    return _json_fill_null(values, [encode_basestring_ascii(val) if isinstance(val, str)
+                                    else _json_value(val) for val in values])
+
+
+def _json_datetime(values):
+    return _json_fill_null(values, ['"{}"'.format(str(val)[:19]) for val in values])
+
+
+def _compile_json_date():
+    # dates repeat a lot, so recently formatted values are cached
+    encode_value = lru_cache(maxsize=4096)(_json_value)
+
+    def encode(values):
+        return [encode_value(val) for val in values]
+    return encode
+
+
+_JSON_ENCODERS = {
+    int: _json_int,
+    float: _json_float,
+    str: _json_str,
+    bool: _json_bool,
+    datetime: _json_datetime,
+}
+
+
+def compile_json_encoder(python_type):
+    """function to encode a list of values of ``python_type`` as json
+
+    numbers and booleans are not quoted. dates are formatted as ``format_value``.
+    """
+    if python_type is date:
+        return _compile_json_date()
+    return _JSON_ENCODERS.get(python_type, _json_any)
+
+
+def compile_json_encoders(dataschema):
+    """json encoders for each column of the table"""
+    return [compile_json_encoder(getattr(col, 'python_type', None))
+            for col in dataschema.columns]
+
+
+def compile_json_template(keys):
+    """format string of a json object with ``keys``
+
+    keys are escaped once. ``template.format(*values)`` makes a json line
+    from encoded values.
+    """
+    items = []
+    for key in keys:
+        escaped = encode_basestring_ascii(key)
+        items.append(escaped.replace('{', '{{').replace('}', '}}') + ': {}')
+    return '{{' + ', '.join(items) + '}}'
+
+
+class SqlDialect(object):
+    """literals and statements of a SQL dialect
+
+    :param escape_backslash: backslash is an escape character in string literals
+    """
+    def __init__(self, name, identifier_quote='"', true='TRUE', false='FALSE',
+                 begin='BEGIN;', escape_backslash=False):
+        self.name = name
+        self._identifier_quote = identifier_quote
+        self.true = true
+        self.false = false
+        self.begin = begin
+        self._escape_backslash = escape_backslash
+
+    def quote_identifier(self, name):
+        quote = self._identifier_quote
+        return quote + name.replace(quote, quote * 2) + quote
+
+    def quote_string(self, text):
+        if self._escape_backslash:
+            text = text.replace('\\', '\\\\').replace('\0', '\\0')
+        return "'" + text.replace("'", "''") + "'"
+
+
+SQL_DIALECTS = {
+    'sqlite': SqlDialect('sqlite', true='1', false='0',
+                         begin='BEGIN TRANSACTION;'),
+    'mysql': SqlDialect('mysql', identifier_quote='`', true='1', false='0',
+                        begin='START TRANSACTION;', escape_backslash=True),
+    'postgresql': SqlDialect('postgresql'),
+}
+
+
+def _sql_fill_null(values, result):
+    if None in values:
+        return ['NULL' if val is None else res for val, res in zip(values, result)]
+    return result
+
+
+def _sql_float(values):
+    result = _sql_fill_null(values, list(map(repr, values)))
+    if not _NON_FINITE.isdisjoint(result):
+        # NaN and infinity are not valid SQL literals
+        return ['NULL' if text in _NON_FINITE else text for text in result]
+    return result
+
+
+def _compile_sql_encoder(python_type, dialect):
+    quote = dialect.quote_string
+
+    def sql_value(val):
+        if val is None:
+            return 'NULL'
+        elif isinstance(val, bool):
+            return dialect.true if val else dialect.false
+        elif isinstance(val, int):
+            return repr(val)
+        elif isinstance(val, float):
+            # NaN and infinity are not valid SQL literals
+            return repr(val) if math.isfinite(val) else 'NULL'
+        return quote(format_value(val))
+
+    if python_type is int:
+        return lambda values: _sql_fill_null(values, list(map(str, values)))
+    if python_type is float:
+        return _sql_float
+    if python_type is bool:
+        return lambda values: [(dialect.true if val else dialect.false)
+                               if val is not None else 'NULL' for val in values]
+    if python_type is str:
+        return lambda values: _sql_fill_null(values, [quote(val) if isinstance(val, str)
+                                                      else sql_value(val)
+                                                      for val in values])
+    if python_type is datetime:
+        return lambda values: _sql_fill_null(values, ["'{}'".format(str(val)[:19])
+                                                      for val in values])
+    return lambda values: [sql_value(val) for val in values]
+
+
+def compile_sql_encoders(dataschema, dialect):
+    """functions to encode a list of values of each column as SQL literals
+
+    :param dialect: SqlDialect
+    """
+    return [_compile_sql_encoder(getattr(col, 'python_type', None), dialect)
+            for col in dataschema.columns]
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from datetime import datetime
+import hashlib
+import math
+import struct
+import warnings
+
+from testdata import (Factory, Constant, CountingFactory, RandomInteger,
+                      RandomSelection, RandomLengthStringFactory,
+                      RandomDateFactory)
+from .factory import WeightedChoiceFactory, WordFactory, get_faker, to_list
+from .pool import ValuePool
+from .rng import random_bits, seed_row
+
+
+class BloomFilter(object):
+    """Bloom filter of values
+
+    :param capacity: expected number of values
+    :param error_rate: false positive rate at ``capacity``
+    """
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        size = int(-capacity * math.log(error_rate) / math.log(2) ** 2) + 1
+        self._size = size
+        self._hashes = max(int(round(size / capacity * math.log(2))), 1)
+        self._bits = bytearray(size // 8 + 1)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(repr(value).encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        for i in range(self._hashes):
+            yield (h1 + i * h2) % self._size
+
+    def add(self, value):
+        """add value. return False if the value may have been added already"""
+        added = False
+        bits = self._bits
+        for position in self._positions(value):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                added = True
+        return added
+
+
+class ValueSet(object):
+    """set of generated values
+
+    values are kept in a set up to ``exact_limit`` values, then moved to
+    a Bloom filter so memory stays bounded. a false positive of the filter
+    only causes a redraw, so values are still unique.
+
+    a set is shared by copies of factories, like ``keypool.KeyPool``, so
+    copies generating consecutive row ranges check values of previous ranges.
+
+    :param capacity: expected number of values
+    """
+    exact_limit = 5000000
+
+    def __init__(self, capacity=None, error_rate=0.001):
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._exact = set()
+        self._bloom = None
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def set_capacity(self, capacity):
+        self._capacity = capacity
+
+    def clear(self):
+        self._exact = set()
+        self._bloom = None
+
+    def add(self, value):
+        """add value. return False if the value was (may have been) added already"""
+        if self._bloom is not None:
+            return self._bloom.add(value)
+        exact = self._exact
+        if value in exact:
+            return False
+        exact.add(value)
+        if len(exact) > self.exact_limit:
+            self._to_bloom()
+        return True
+
+    def _to_bloom(self):
+        capacity = max(self._capacity or 0, len(self._exact) * 4)
+        self._bloom = BloomFilter(capacity, self._error_rate)
+        for value in self._exact:
+            self._bloom.add(value)
+        self._exact = set()
+
+
+def value_space(factory):
+    """number of distinct values ``factory`` can return. None if unknown or unbounded"""
+    if isinstance(factory, UniqueFactory):
+        return value_space(factory.base)
+    if isinstance(factory, Constant):
+        return 1
+    if isinstance(factory, RandomInteger):
+        return factory._maximum - factory._minimum + 1
+    if isinstance(factory, RandomSelection):
+        return len(set(factory._sequence))
+    if isinstance(factory, WeightedChoiceFactory):
+        return len(set(choice for choice, prob
+                       in zip(factory._choices, factory._table.probabilities())
+                       if prob > 0))
+    if isinstance(factory, RandomLengthStringFactory):
+        return sum(52 ** length for length in range(factory._min_chars,
+                                                     factory._max_chars + 1))
+    if isinstance(factory, RandomDateFactory):
+        if isinstance(factory._minimum, datetime):
+            return int(factory._delta_seconds * 10 ** 6) + 1
+        return int(factory._delta_seconds // 86400) + 1
+    if isinstance(getattr(factory, '_pool', None), ValuePool):
+        return len(set(factory._pool))
+    if isinstance(factory, WordFactory):
+        words = getattr(get_faker(), 'get_words_list', None)
+        if words is not None:
+            return len(set(word[:factory.length] for word in words()))
+    return None
+
+
+def is_unique_factory(factory):
+    """True if values of ``factory`` never repeat"""
+    return isinstance(factory, CountingFactory) and factory._step != 0
+
+
+def warn_value_space(name, space, amount):
+    if space is not None and amount > space:
+        warnings.warn('{} rows are requested for unique {}, but only {} values '
+                      'can be generated'.format(amount, name, space))
+
+
+def redraw(factory, attempt):
+    """draw another value of the current row
+
+    factories drawing from a counter based stream use another stream per attempt.
+    """
+    key = getattr(factory, '_key', None)
+    if key is None:
+        return factory()
+    factory._key = random_bits(key, attempt)
+    try:
+        return factory()
+    finally:
+        factory._key = key
+
+
+class UniqueFactory(Factory):
+    """redraw values of ``base`` factory which are generated already
+
+    values are unique from row 0. generated values are forgotten when
+    generation starts again at row 0, and kept by copies starting
+    at later rows, see ``ValueSet``.
+
+    :param max_retries: give up after this number of redraws of a row
+    """
+    def __init__(self, base, name='column', max_retries=100):
+        self.base = base
+        self.name = name
+        self._max_retries = max_retries
+        self._seen = ValueSet()
+        self._row_key = None
+        super(UniqueFactory, self).__init__()
+
+    def __iter__(self):
+        if self.current_index == 0:
+            self.reset_unique()
+        self.base = iter(self.base)
+        return super(UniqueFactory, self).__iter__()
+
+    def set_element_amount(self, element_amount):
+        super(UniqueFactory, self).set_element_amount(element_amount)
+        self.base.set_element_amount(element_amount)
+        warn_value_space(self.name, value_space(self.base), element_amount)
+        self._seen.set_capacity(element_amount)
+
+    def reset_unique(self):
+        self._seen.clear()
+
+    def increase_index(self):
+        super(UniqueFactory, self).increase_index()
+        self.base.increase_index()
+
+    def seek(self, index):
+        self._current_index = index
+        if hasattr(self.base, 'seek'):
+            self.base.seek(index)
+        else:
+            self.base._current_index = index
+
+    def seed_rows(self, key):
+        # same fallback as ``schema.Column.seed_rows``
+        if hasattr(self.base, 'seed_rows'):
+            self.base.seed_rows(key)
+        else:
+            self._row_key = key
+
+    def _unique(self, value, attempt=0):
+        while not self._seen.add(value):
+            attempt += 1
+            if attempt > self._max_retries:
+                raise ValueError('could not generate unique value for {} '
+                                 'after {} retries'.format(self.name, self._max_retries))
+            value = redraw(self.base, attempt)
+        return value
+
+    def __call__(self):
+        if self._row_key is not None:
+            seed_row(self._row_key, self.current_index)
+        return self._unique(self.base())
+
+    def batch(self, size):
+        start = self.current_index
+        if start == 0:
+            self.reset_unique()
+        base = self.base
+        row_key = self._row_key
+        if row_key is not None:
+            values = []
+            for index in range(start, start + size):
+                base._current_index = index
+                seed_row(row_key, index)
+                values.append(self._unique(base()))
+            base._current_index = start + size
+            self._current_index += size
+            return values
+        if hasattr(base, 'batch'):
+            values = to_list(base.batch(size))
+        else:
+            values = []
+            for _ in range(size):
+                values.append(base())
+                base.increase_index()
+        seen = self._seen
+        for offset, value in enumerate(values):
+            if not seen.add(value):
+                base._current_index = start + offset
+                values[offset] = self._unique(redraw(base, 1), 1)
+        base._current_index = start + size
+        self._current_index += size
+        return values
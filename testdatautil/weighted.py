@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""weighted choice by the alias method
+
+an ``AliasTable`` of n weights is n columns of equal probability. column i
+holds index i with probability ``prob[i]``, and ``alias[i]`` otherwise.
+a draw picks a column and a side from one uniform number, so the cost does
+not depend on the number of choices.
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from collections import OrderedDict
+import csv
+import io
+import json
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class AliasTable(object):
+    """alias table of ``weights`` (Vose's method)"""
+    def __init__(self, weights):
+        weights = [float(weight) for weight in weights]
+        if not weights:
+            raise ValueError('no weights are given')
+        if any(weight < 0 for weight in weights):
+            raise ValueError('weights must not be negative')
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError('sum of weights must be positive')
+        size = len(weights)
+        scaled = [weight * size / total for weight in weights]
+        prob = [1.0] * size
+        alias = list(range(size))
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # rest are 1 up to rounding errors
+        self.prob = prob
+        self.alias = alias
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, uniform):
+        """index drawn from a uniform number in [0, 1)"""
+        position = uniform * len(self.prob)
+        column = int(position)
+        if position - column < self.prob[column]:
+            return column
+        return self.alias[column]
+
+    def sample_array(self, uniforms):
+        """indexes drawn from an array of uniform numbers in [0, 1)"""
+        if self._arrays is None:
+            self._arrays = (numpy.array(self.prob, dtype=numpy.float64),
+                            numpy.array(self.alias, dtype=numpy.int64))
+        prob, alias = self._arrays
+        position = uniforms * len(prob)
+        columns = position.astype(numpy.int64)
+        return numpy.where(position - columns < prob[columns], columns, alias[columns])
+
+    def probabilities(self):
+        """probability of each index"""
+        size = len(self.prob)
+        result = [value / size for value in self.prob]
+        for column, value in enumerate(self.prob):
+            result[self.alias[column]] += (1.0 - value) / size
+        return result
+
+
+def load_weights(path):
+    """weights by value from a frequency file
+
+    a JSON object of value to weight if the file name ends with .json,
+    otherwise CSV rows of value and weight. a first row whose weight is
+    not a number is a header.
+    """
+    with io.open(path, encoding='utf-8', newline='') as fio:
+        if path.endswith('.json'):
+            return json.load(fio, object_pairs_hook=OrderedDict)
+        weights = OrderedDict()
+        for number, row in enumerate(csv.reader(fio)):
+            if not row:
+                continue
+            if len(row) != 2:
+                raise ValueError('{}:{}: expected value,weight'.format(path, number + 1))
+            value, weight = row
+            try:
+                weights[value] = float(weight)
+            except ValueError:
+                if number == 0:
+                    continue
+                raise
+        return weights